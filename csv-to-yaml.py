@@ -1,8 +1,323 @@
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+import argparse
 import csv
-import yaml
+import hashlib
+import json
 import os
+import sys
+import tempfile
+from collections import Counter
+
+import yaml
+
+try:
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox
+except ImportError:  # headless build servers
+    tk = None
+
+DEFAULT_PORT = 23
+
+SHADE_KEYWORDS = ["persiana", "cortina", "shade", "cover", "blind"]
+
+# category -> (HA platform, list key in the platform config)
+CATEGORY_PLATFORMS = {
+    "light": ("light", "lights"),
+    "shade": ("cover", "covers"),
+    "keypad": ("sensor", "buttons"),
+    "button": ("sensor", "buttons"),
+}
+PLATFORM_ORDER = ["light", "cover", "sensor"]
+ALL_CATEGORIES = ["light", "shade", "keypad", "button"]
+
+
+def parse_address(address: str):
+    parts = address.split(":")
+    if len(parts) != 2:
+        return address, None
+    try:
+        return int(parts[0]), int(parts[1])
+    except ValueError:
+        return parts[0], parts[1]
+
+
+def categorize_row(row):
+    entity = row.get("Entity", "").strip().lower()
+    label = row.get("Label", "")
+    button_type = row.get("Button Type", "").strip().lower()
+
+    device, channel = parse_address(row.get("Address", "0:0"))
+
+    if entity in {"dimmer", "switch", "light"}:
+        return "light", {
+            "name": label,
+            "device": device,
+            "channel": channel,
+            "dimmer": entity == "dimmer",
+        }
+
+    if entity in {"shade", "cover", "curtain", "blind", "persiana"}:
+        return "shade", {"name": label, "device": device, "channel": channel}
+
+    # Heuristic: switches named like shades
+    if entity == "switch" and any(word.lower() in label.lower() for word in SHADE_KEYWORDS):
+        return "shade", {"name": label, "device": device, "channel": channel}
+
+    if entity == "keypad button":
+        return "keypad", {"name": label, "device": device, "button": channel}
+
+    if entity == "button":
+        return "button", {"name": label, "device": device, "button": channel}
+
+    return None, None
+
+
+def _valid_address(payload) -> bool:
+    address = [v for k, v in payload.items() if k in ("device", "channel", "button")]
+    return all(isinstance(v, int) for v in address)
+
+
+class YAMLStreamWriter:
+    """Write dinplug platform YAML incrementally, one entry at a time.
+
+    Entries are spilled to one temporary file per (platform, host) as they
+    arrive, so memory use does not depend on the size of the export. The
+    spills are stitched together under their platform keys on close().
+    """
+
+    def __init__(self, port: int = DEFAULT_PORT):
+        self._port = port
+        self._spills = {}
+
+    def add(self, category: str, host: str, payload) -> None:
+        platform, list_key = CATEGORY_PLATFORMS[category]
+        key = (platform, host)
+        spill = self._spills.get(key)
+        if spill is None:
+            spill = self._spills[key] = tempfile.TemporaryFile(
+                "w+", encoding="utf-8"
+            )
+            header = {"platform": "dinplug", "host": host, "port": self._port, list_key: None}
+            text = yaml.dump([header], default_flow_style=False, sort_keys=False)
+            # "lights: null" -> "lights:" so entries can follow
+            spill.write(text[: -len(" null\n")] + "\n")
+        entry = yaml.dump(
+            [payload], default_flow_style=False, allow_unicode=True, sort_keys=False
+        )
+        spill.write("".join("  " + line for line in entry.splitlines(True)))
+
+    def close(self, out) -> bool:
+        """Write the assembled YAML to out; return False if nothing was added."""
+        written = False
+        for platform in PLATFORM_ORDER:
+            spills = [s for (p, _), s in self._spills.items() if p == platform]
+            if not spills:
+                continue
+            out.write(f"{platform}:\n")
+            for spill in spills:
+                spill.seek(0)
+                for line in spill:
+                    out.write(line)
+                spill.close()
+            written = True
+        self._spills = {}
+        return written
+
+
+def iter_entries(sources, categories, rejected, rejects=None):
+    """Yield (category, host, payload) for every usable row of the sources.
+
+    Rejection reasons are counted in rejected; rejected rows are also
+    written to the rejects csv.writer when one is given.
+    """
+    for csv_path, host in sources:
+        with open(csv_path, "r", encoding="utf-8", newline="") as csv_file:
+            for line_no, row in enumerate(csv.DictReader(csv_file), start=2):
+                category, payload = categorize_row(row)
+                if category is None:
+                    reason = f"unsupported entity {row.get('Entity', '').strip()!r}"
+                elif category not in categories:
+                    continue
+                elif not _valid_address(payload):
+                    reason = f"invalid address {row.get('Address', '')!r}"
+                else:
+                    yield category, host, payload
+                    continue
+                rejected[reason] += 1
+                if rejects is not None:
+                    rejects.writerow([csv_path, line_no, reason] + list(row.values()))
+
+
+def convert(sources, out, categories=ALL_CATEGORIES, port=DEFAULT_PORT, rejects=None):
+    """Stream (csv_path, host) sources into YAML on out.
+
+    Returns (counts, rejected): per-category entry counts and a Counter of
+    rejection reasons.
+    """
+    writer = YAMLStreamWriter(port)
+    counts = Counter()
+    rejected = Counter()
+
+    for category, host, payload in iter_entries(sources, categories, rejected, rejects):
+        writer.add(category, host, payload)
+        counts[category] += 1
+
+    writer.close(out)
+    return counts, rejected
+
+
+# ---------- Incremental merge ----------
+
+
+class _Tagged:
+    """Opaque HA tag such as !include or !secret, kept as written."""
+
+    def __init__(self, tag, node):
+        self.tag = tag
+        self.node = node
+
+
+class _MergeLoader(yaml.SafeLoader):
+    pass
+
+
+class _MergeDumper(yaml.SafeDumper):
+    pass
+
+
+_MergeLoader.add_multi_constructor("!", lambda loader, suffix, node: _Tagged(node.tag, node))
+_MergeDumper.add_representer(_Tagged, lambda dumper, data: data.node)
+
+
+def _entry_key(platform: str, host: str, payload) -> str:
+    address = payload.get("channel", payload.get("button"))
+    return f"{platform}|{host}|{payload['device']}|{address}"
+
+
+def _entry_hash(payload) -> str:
+    # default=str: entries read back from YAML may hold !secret/!include tags
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def hashes_path(yaml_path: str) -> str:
+    return yaml_path + ".dinplug-hashes.json"
+
+
+def merge(sources, yaml_path, categories=ALL_CATEGORIES, port=DEFAULT_PORT, rejects=None):
+    """Merge the sources into an existing YAML file, touching only changed rows.
+
+    Each categorized row is hashed and compared with the hash recorded for
+    it on the previous run (stored next to the YAML file). Rows without a
+    recorded hash (a YAML file written without --merge, or a lost hash
+    file) are compared with the entry in the YAML instead; if they differ,
+    the entry is kept as is and reported, since it may hold manual edits.
+    Only added, changed and removed entries are written; unchanged entries
+    keep any manual edits, and unrelated content is preserved (comments
+    are not).
+
+    Returns (diff, rejected): a dict of added/changed/removed/kept key lists
+    and a Counter of rejection reasons.
+    """
+    rejected = Counter()
+    fresh = {}
+    for category, host, payload in iter_entries(sources, categories, rejected, rejects):
+        platform, list_key = CATEGORY_PLATFORMS[category]
+        key = _entry_key(platform, host, payload)
+        fresh[key] = (platform, host, list_key, payload, _entry_hash(payload), category)
+
+    doc = {}
+    if os.path.exists(yaml_path):
+        with open(yaml_path, "r", encoding="utf-8") as yaml_file:
+            doc = yaml.load(yaml_file, Loader=_MergeLoader) or {}
+    # key -> (hash, category); files from older versions only stored the hash
+    previous = {}
+    if os.path.exists(hashes_path(yaml_path)):
+        with open(hashes_path(yaml_path), "r", encoding="utf-8") as state_file:
+            for key, value in json.load(state_file).items():
+                previous[key] = tuple(value) if isinstance(value, list) else (value, None)
+
+    # Index existing dinplug entries and platform blocks
+    blocks = {}
+    located = {}
+    for platform in PLATFORM_ORDER:
+        for block in doc.get(platform) or []:
+            if not isinstance(block, dict) or block.get("platform") != "dinplug":
+                continue
+            for list_key in (k for p, k in CATEGORY_PLATFORMS.values() if p == platform):
+                if list_key not in block:
+                    continue
+                blocks.setdefault((platform, block.get("host"), list_key), block)
+                for entry in block[list_key] or []:
+                    key = _entry_key(platform, block.get("host"), entry)
+                    located[key] = (block[list_key], entry)
+
+    diff = {"added": [], "changed": [], "removed": [], "kept": []}
+
+    # Only rows of the hosts and categories processed in this run can be
+    # removed. keypad and button rows share a platform, so the category
+    # comes from the saved state; without it, every category of the
+    # platform must have been processed.
+    hosts = {str(host) for _, host in sources}
+
+    def in_scope(key: str) -> bool:
+        platform, host = key.split("|")[:2]
+        if host not in hosts:
+            return False
+        category = previous[key][1]
+        if category is not None:
+            return category in categories
+        return all(
+            c in categories for c, (p, _) in CATEGORY_PLATFORMS.items() if p == platform
+        )
+
+    for key in previous:
+        if key not in fresh and key in located and in_scope(key):
+            entries, entry = located.pop(key)
+            entries.remove(entry)
+            diff["removed"].append(key)
+
+    for key, (platform, host, list_key, payload, digest, _) in fresh.items():
+        if key in located:
+            entries, entry = located[key]
+            if key not in previous:
+                if _entry_hash(entry) != digest:
+                    diff["kept"].append(key)
+                continue
+            if previous[key][0] == digest:
+                continue
+            entries[entries.index(entry)] = payload
+            diff["changed"].append(key)
+            continue
+        block = blocks.get((platform, host, list_key))
+        if block is None:
+            block = {"platform": "dinplug", "host": host, "port": port, list_key: []}
+            doc.setdefault(platform, [])
+            if doc[platform] is None:
+                doc[platform] = []
+            doc[platform].append(block)
+            blocks[(platform, host, list_key)] = block
+        if block[list_key] is None:
+            block[list_key] = []
+        block[list_key].append(payload)
+        diff["added"].append(key)
+
+    modified = diff["added"] or diff["changed"] or diff["removed"]
+    if modified or not os.path.exists(yaml_path):
+        with open(yaml_path, "w", encoding="utf-8") as yaml_file:
+            yaml.dump(
+                doc,
+                yaml_file,
+                Dumper=_MergeDumper,
+                default_flow_style=False,
+                allow_unicode=True,
+                sort_keys=False,
+            )
+    with open(hashes_path(yaml_path), "w", encoding="utf-8") as state_file:
+        state = {key: list(value) for key, value in previous.items() if not in_scope(key)}
+        state.update((key, [value[4], value[5]]) for key, value in fresh.items())
+        json.dump(state, state_file, indent=0)
+
+    return diff, rejected
 
 
 class CSVToYAMLConverter:
@@ -111,45 +426,10 @@ class CSVToYAMLConverter:
             self.csv_file_path.set(file_path)
 
     def _parse_address(self, address: str):
-        parts = address.split(":")
-        if len(parts) != 2:
-            return address, None
-        try:
-            return int(parts[0]), int(parts[1])
-        except ValueError:
-            return parts[0], parts[1]
+        return parse_address(address)
 
     def _categorize_row(self, row):
-        entity = row.get("Entity", "").strip().lower()
-        label = row.get("Label", "")
-        button_type = row.get("Button Type", "").strip().lower()
-
-        device, channel = self._parse_address(row.get("Address", "0:0"))
-
-        shade_keywords = ["persiana", "cortina", "shade", "cover", "blind"]
-
-        if entity in {"dimmer", "switch", "light"}:
-            return "light", {
-                "name": label,
-                "device": device,
-                "channel": channel,
-                "dimmer": entity == "dimmer",
-            }
-
-        if entity in {"shade", "cover", "curtain", "blind", "persiana"}:
-            return "shade", {"name": label, "device": device, "channel": channel}
-
-        # Heuristic: switches named like shades
-        if entity == "switch" and any(word.lower() in label.lower() for word in shade_keywords):
-            return "shade", {"name": label, "device": device, "channel": channel}
-
-        if entity == "keypad button":
-            return "keypad", {"name": label, "device": device, "button": channel}
-
-        if entity == "button":
-            return "button", {"name": label, "device": device, "button": channel}
-
-        return None, None
+        return categorize_row(row)
 
     def convert_to_yaml(self):
         if not self.csv_file_path.get():
@@ -284,7 +564,90 @@ class CSVToYAMLConverter:
             messagebox.showerror("Error", f"Failed to copy to clipboard:\n{err}")
 
 
+def run_cli(argv) -> int:
+    parser = argparse.ArgumentParser(
+        prog="csv-to-yaml.py",
+        description="Convert Roehn Wizard CSV exports to dinplug YAML without the GUI.",
+    )
+    parser.add_argument(
+        "sources",
+        nargs="+",
+        metavar="CSV HOST",
+        help="one or more CSV file / controller host pairs",
+    )
+    parser.add_argument("-o", "--output", help="YAML file to write (default: stdout)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--only",
+        action="append",
+        choices=ALL_CATEGORIES,
+        help="convert only these categories (repeatable; default: all)",
+    )
+    parser.add_argument("--rejects", help="write rejected rows to this CSV file")
+    parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="merge into the --output file, writing only added/changed/removed entries",
+    )
+    args = parser.parse_args(argv)
+
+    if len(args.sources) % 2:
+        parser.error("sources must be given as CSV HOST pairs")
+    sources = list(zip(args.sources[::2], args.sources[1::2]))
+    categories = args.only or ALL_CATEGORIES
+    if args.merge and not args.output:
+        parser.error("--merge requires --output")
+
+    if args.merge:
+        return _run_merge(args, sources, categories)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    rejects_file = (
+        open(args.rejects, "w", encoding="utf-8", newline="") if args.rejects else None
+    )
+    try:
+        rejects = csv.writer(rejects_file) if rejects_file else None
+        if rejects is not None:
+            rejects.writerow(["file", "line", "reason", "row..."])
+        counts, rejected = convert(sources, out, categories, args.port, rejects)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if rejects_file is not None:
+            rejects_file.close()
+
+    for category in ALL_CATEGORIES:
+        print(f"{category}: {counts[category]}", file=sys.stderr)
+    print(f"rejected: {sum(rejected.values())}", file=sys.stderr)
+    for reason, count in rejected.most_common():
+        print(f"  {reason}: {count}", file=sys.stderr)
+    return 0 if counts else 1
+
+
+def _run_merge(args, sources, categories) -> int:
+    rejects_file = (
+        open(args.rejects, "w", encoding="utf-8", newline="") if args.rejects else None
+    )
+    try:
+        rejects = csv.writer(rejects_file) if rejects_file else None
+        diff, rejected = merge(sources, args.output, categories, args.port, rejects)
+    finally:
+        if rejects_file is not None:
+            rejects_file.close()
+
+    for kind in ("added", "changed", "removed", "kept"):
+        print(f"{kind}: {len(diff[kind])}", file=sys.stderr)
+        for key in diff[kind]:
+            print(f"  {key}", file=sys.stderr)
+    print(f"rejected: {sum(rejected.values())}", file=sys.stderr)
+    return 0
+
+
 def main():
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
+    if tk is None:
+        sys.exit("tkinter is not available; pass CSV HOST arguments to run headless")
     root = tk.Tk()
     app = CSVToYAMLConverter(root)
     root.mainloop()
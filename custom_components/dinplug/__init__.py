@@ -1,10 +1,168 @@
 import logging
-from .const import DOMAIN
+
+import voluptuous as vol
+
+from homeassistant.config_entries import SOURCE_IMPORT
+from homeassistant.const import CONF_HOST, CONF_PORT, SERVICE_RELOAD
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.reload import async_integration_yaml_config
+from homeassistant.helpers.start import async_at_started
+
+from .climate import THERMOSTATS_SCHEMA
+from .connection import (
+    DEFAULT_PORT,
+    DEFAULT_UNKNOWN_KEY_CACHE,
+    async_release_connection,
+    get_connection,
+)
+from .const import (
+    CONF_BUTTONS,
+    CONF_BUTTON_BUS_EVENTS,
+    CONF_BUTTON_SENSORS,
+    CONF_CONTROLLERS,
+    CONF_COVERS,
+    CONF_DISCOVERY,
+    CONF_HVACS,
+    CONF_LIGHTS,
+    CONF_PROXY_BIND,
+    CONF_PROXY_PORT,
+    CONF_UNKNOWN_KEY_CACHE,
+    CONF_WORKER_THREAD,
+    DOMAIN,
+    PLATFORMS,
+)
+from .cover import COVERS_SCHEMA
+from .discovery import M4Discovery, configured_keys
+from .light import LIGHTS_SCHEMA
+from .proxy import M4Proxy
+from .services import async_setup_services
+from .sensor import BUTTONS_SCHEMA
+from .startup import async_log_profile_when_started
 
 _LOGGER = logging.getLogger(__name__)
 
+CONTROLLER_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_HOST): cv.string,
+        vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
+        vol.Optional(CONF_DISCOVERY, default=False): cv.boolean,
+        vol.Optional(CONF_PROXY_PORT): cv.port,
+        vol.Optional(CONF_PROXY_BIND, default="127.0.0.1"): cv.string,
+        vol.Optional(CONF_BUTTON_SENSORS, default=False): cv.boolean,
+        vol.Optional(CONF_BUTTON_BUS_EVENTS, default=False): cv.boolean,
+        vol.Optional(CONF_WORKER_THREAD, default=False): cv.boolean,
+        vol.Optional(
+            CONF_UNKNOWN_KEY_CACHE, default=DEFAULT_UNKNOWN_KEY_CACHE
+        ): cv.positive_int,
+        vol.Optional(CONF_LIGHTS, default=[]): LIGHTS_SCHEMA,
+        vol.Optional(CONF_COVERS, default=[]): COVERS_SCHEMA,
+        vol.Optional(CONF_HVACS, default=[]): THERMOSTATS_SCHEMA,
+        vol.Optional(CONF_BUTTONS, default=[]): BUTTONS_SCHEMA,
+    }
+)
+
+CONFIG_SCHEMA = vol.Schema(
+    {
+        DOMAIN: vol.Schema(
+            {
+                vol.Required(CONF_CONTROLLERS): vol.All(
+                    cv.ensure_list, [CONTROLLER_SCHEMA]
+                )
+            }
+        )
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
 
 async def async_setup(hass, config):
-    """Set up via YAML (platforms will handle connection creation)."""
+    """Set up via YAML and import any top-level controllers as config entries."""
     hass.data.setdefault(DOMAIN, {})
+    _import_controllers(hass, config)
+
+    async def _async_reload_yaml(call):
+        """Re-read YAML; changed controllers reload, removed ones are deleted."""
+        new_config = await async_integration_yaml_config(hass, DOMAIN)
+        if new_config is not None:
+            _import_controllers(hass, new_config)
+
+    hass.services.async_register(DOMAIN, SERVICE_RELOAD, _async_reload_yaml)
+    async_setup_services(hass)
+    async_log_profile_when_started(hass)
+    return True
+
+
+def _import_controllers(hass, config) -> None:
+    """Create or update entries for the YAML controllers, remove stale imports."""
+    controllers = config.get(DOMAIN, {}).get(CONF_CONTROLLERS, [])
+    configured = {(c[CONF_HOST], c[CONF_PORT]) for c in controllers}
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if entry.source != SOURCE_IMPORT:
+            continue
+        if (entry.data[CONF_HOST], entry.data[CONF_PORT]) not in configured:
+            _LOGGER.info("Removing DINPLUG controller %s, no longer in YAML", entry.title)
+            hass.async_create_task(hass.config_entries.async_remove(entry.entry_id))
+    for controller in controllers:
+        hass.async_create_task(
+            hass.config_entries.flow.async_init(
+                DOMAIN, context={"source": SOURCE_IMPORT}, data=controller
+            )
+        )
+
+
+async def async_setup_entry(hass, entry):
+    """Set up one controller: a single shared connection for all platforms."""
+    conn = get_connection(
+        hass,
+        entry.data[CONF_HOST],
+        entry.data[CONF_PORT],
+        worker=entry.data.get(CONF_WORKER_THREAD, False),
+        unknown_key_cache=entry.data.get(
+            CONF_UNKNOWN_KEY_CACHE, DEFAULT_UNKNOWN_KEY_CACHE
+        ),
+        button_bus_events=entry.data.get(CONF_BUTTON_BUS_EVENTS, False),
+    )
+    # Configured keys are cached even before their entities subscribe
+    conn.declare_keys(configured_keys(entry.data))
+    hass.data[DOMAIN][entry.entry_id] = conn
+
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    async def _async_start_background(_hass) -> None:
+        """Discovery and the proxy are not needed to start; run them afterwards."""
+        if entry.data.get(CONF_DISCOVERY):
+            discovery = M4Discovery(hass, entry.entry_id, conn)
+            discovery.start(configured_keys(entry.data))
+            entry.async_on_unload(discovery.stop)
+
+        if entry.data.get(CONF_PROXY_PORT):
+            proxy = M4Proxy(
+                conn,
+                entry.data.get(CONF_PROXY_BIND, "127.0.0.1"),
+                entry.data[CONF_PROXY_PORT],
+            )
+            try:
+                await proxy.async_start()
+            except OSError as err:
+                _LOGGER.error("Could not start DINPLUG proxy: %s", err)
+            else:
+                entry.async_on_unload(proxy.async_stop)
+
+    entry.async_on_unload(async_at_started(hass, _async_start_background))
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
     return True
+
+
+async def async_unload_entry(hass, entry):
+    """Unload platforms and close the controller connection."""
+    unloaded = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unloaded:
+        hass.data[DOMAIN].pop(entry.entry_id, None)
+        await async_release_connection(
+            hass, entry.data[CONF_HOST], entry.data[CONF_PORT]
+        )
+    return unloaded
+
+
+async def _async_update_listener(hass, entry):
+    await hass.config_entries.async_reload(entry.entry_id)
@@ -17,52 +17,120 @@ from homeassistant.const import (
     CONF_PORT,
     UnitOfTemperature,
 )
+from homeassistant.core import callback
 import homeassistant.helpers.config_validation as cv
 
-from .connection import DEFAULT_PORT, M4Connection, ThermostatState, get_connection
-from .const import CONF_DEVICE, CONF_HVACS, CONF_MAX_TEMP, CONF_MIN_TEMP
+from .connection import (
+    DEFAULT_PORT,
+    KIND_HVAC,
+    M4Connection,
+    ThermostatState,
+    get_connection,
+)
+from .const import (
+    CONF_DEVICE,
+    CONF_HVACS,
+    CONF_MAX_TEMP,
+    CONF_MIN_TEMP,
+    CONF_TEMP_DEADBAND,
+    CONF_TEMP_MIN_INTERVAL,
+    DOMAIN,
+)
+from .discovery import async_setup_discovered
+from .entity import M4Entity
+from .startup import bulk_list, profiled
 
 _LOGGER = logging.getLogger(__name__)
 
+DEFAULT_MIN_TEMP = 6
+DEFAULT_MAX_TEMP = 33
+
 THERMOSTAT_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_NAME): cv.string,
         vol.Required(CONF_DEVICE): vol.Coerce(int),
-        vol.Optional(CONF_MIN_TEMP, default=6): vol.Coerce(float),
-        vol.Optional(CONF_MAX_TEMP, default=33): vol.Coerce(float),
+        vol.Optional(CONF_MIN_TEMP, default=DEFAULT_MIN_TEMP): vol.Coerce(float),
+        vol.Optional(CONF_MAX_TEMP, default=DEFAULT_MAX_TEMP): vol.Coerce(float),
+        vol.Optional(CONF_TEMP_DEADBAND, default=0): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
+        vol.Optional(CONF_TEMP_MIN_INTERVAL, default=0): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
     }
 )
 
+THERMOSTATS_SCHEMA = bulk_list(
+    "hvac", THERMOSTAT_SCHEMA, {CONF_NAME: str, CONF_DEVICE: int}
+)
+
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     {
         vol.Required(CONF_HOST): cv.string,
         vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
-        vol.Required(CONF_HVACS): vol.All(cv.ensure_list, [THERMOSTAT_SCHEMA]),
+        vol.Required(CONF_HVACS): THERMOSTATS_SCHEMA,
     }
 )
 
 
+@profiled("climate")
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     """Set up dinplug HVAC controllers from YAML."""
     host = config[CONF_HOST]
     port = config[CONF_PORT]
-    hvac_conf = config[CONF_HVACS]
-
     conn = get_connection(hass, host, port)
+    async_add_entities(_build_entities(conn, host, port, config[CONF_HVACS]))
+
+
+@profiled("climate")
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Set up dinplug HVAC controllers from a config entry."""
+    conn = hass.data[DOMAIN][entry.entry_id]
+    host = entry.data[CONF_HOST]
+    port = entry.data[CONF_PORT]
+    async_add_entities(
+        _build_entities(conn, host, port, entry.data.get(CONF_HVACS, []))
+    )
+
+    def _discovered(dev) -> M4Climate:
+        return M4Climate(
+            conn,
+            host,
+            port,
+            f"DINPLUG HVAC {dev}",
+            dev,
+            DEFAULT_MIN_TEMP,
+            DEFAULT_MAX_TEMP,
+            discovered=True,
+        )
 
+    async_setup_discovered(hass, entry, KIND_HVAC, async_add_entities, _discovered)
+
+
+def _build_entities(conn: M4Connection, host: str, port: int, confs) -> list:
     entities = []
-    for cfg in hvac_conf:
+    for cfg in confs:
         name = cfg[CONF_NAME]
         dev = cfg[CONF_DEVICE]
         min_temp = cfg[CONF_MIN_TEMP]
         max_temp = cfg[CONF_MAX_TEMP]
-        entities.append(M4Climate(conn, host, port, name, dev, min_temp, max_temp))
-
-    async_add_entities(entities, update_before_add=True)
+        entities.append(
+            M4Climate(
+                conn,
+                host,
+                port,
+                name,
+                dev,
+                min_temp,
+                max_temp,
+                temperature_deadband=cfg.get(CONF_TEMP_DEADBAND, 0),
+                min_write_interval=cfg.get(CONF_TEMP_MIN_INTERVAL, 0),
+            )
+        )
+    return entities
 
 
-class M4Climate(ClimateEntity):
-    _attr_should_poll = False
+class M4Climate(M4Entity, ClimateEntity):
     _attr_temperature_unit = UnitOfTemperature.CELSIUS
     _attr_supported_features = (
         ClimateEntityFeature.TARGET_TEMPERATURE | ClimateEntityFeature.FAN_MODE
@@ -84,6 +152,9 @@ class M4Climate(ClimateEntity):
         device: int,
         min_temp: float,
         max_temp: float,
+        temperature_deadband: float = 0.0,
+        min_write_interval: float = 0.0,
+        discovered: bool = False,
     ):
         self._conn = conn
         self._host = host
@@ -92,6 +163,11 @@ class M4Climate(ClimateEntity):
         self._device = device
         self._min_temp = min_temp
         self._max_temp = max_temp
+        # Current/external temperature changes smaller than the deadband are
+        # not written; min_write_interval spaces out the ones that are
+        self._temp_deadband = temperature_deadband
+        self._min_write_interval = min_write_interval
+        self._attr_entity_registry_enabled_default = not discovered
 
         self._attr_unique_id = f"{self._host}-{self._port}-hvac-{self._device}"
         self._hvac_mode: HVACMode = HVACMode.OFF
@@ -99,9 +175,14 @@ class M4Climate(ClimateEntity):
         self._target_temp: Optional[float] = None
         self._current_temp: Optional[float] = None
 
-        self._conn.register_thermostat_listener(
-            self._device, self._handle_state_update
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._conn.register_thermostat_listener(
+                self._device, self._handle_state_update
+            )
         )
+
         last = self._conn.get_last_thermostat_state(self._device)
         if last is not None:
             self._handle_state_update(last)
@@ -156,6 +237,7 @@ class M4Climate(ClimateEntity):
 
     # --- Callbacks from the connection ---
 
+    @callback
     def _handle_state_update(self, state: ThermostatState) -> None:
         mode_map = {
             "HEAT": HVACMode.HEAT,
@@ -170,18 +252,39 @@ class M4Climate(ClimateEntity):
             "FANAUTO": "auto",
         }
 
+        target_temp = self._target_temp
         if state.target_temp is not None:
-            self._target_temp = state.target_temp
-        if state.current_temp is not None:
-            self._current_temp = state.current_temp
-        elif state.external_temp is not None and self._current_temp is None:
-            self._current_temp = state.external_temp
-        if state.hvac_mode is not None and state.hvac_mode in mode_map:
-            self._hvac_mode = mode_map[state.hvac_mode]
-        if state.fan_mode is not None and state.fan_mode in fan_map:
-            self._fan_mode = fan_map[state.fan_mode]
-
-        self.schedule_update_ha_state()
+            target_temp = state.target_temp
+        hvac_mode = mode_map.get(state.hvac_mode, self._hvac_mode)
+        fan_mode = fan_map.get(state.fan_mode, self._fan_mode)
+        setting_changed = (target_temp, hvac_mode, fan_mode) != (
+            self._target_temp,
+            self._hvac_mode,
+            self._fan_mode,
+        )
+        self._target_temp = target_temp
+        self._hvac_mode = hvac_mode
+        self._fan_mode = fan_mode
+
+        current = state.current_temp
+        if current is None:
+            current = state.external_temp
+        temp_changed = (
+            current is not None
+            and current != self._current_temp
+            and (
+                self._current_temp is None
+                or abs(current - self._current_temp) >= self._temp_deadband
+            )
+        )
+        if temp_changed:
+            self._current_temp = current
+
+        if setting_changed:
+            # Setpoint and mode changes are user-visible; never hold them back
+            self._async_write_limited(final=True)
+        elif temp_changed:
+            self._async_write_limited()
 
     # --- Commands from HA ---
 
@@ -208,7 +311,7 @@ class M4Climate(ClimateEntity):
             return
 
         self._hvac_mode = hvac_mode
-        self.schedule_update_ha_state()
+        self.async_write_ha_state()
 
     async def async_set_fan_mode(self, fan_mode: str):
         fan_mode = fan_mode.lower()
@@ -222,4 +325,4 @@ class M4Climate(ClimateEntity):
             return
         self._conn.send_hvac_fan_mode(self._device, fan_map[fan_mode])
         self._fan_mode = fan_mode
-        self.schedule_update_ha_state()
+        self.async_write_ha_state()
@@ -0,0 +1,58 @@
+import logging
+
+import voluptuous as vol
+
+from homeassistant import config_entries
+from homeassistant.const import CONF_HOST, CONF_PORT
+
+from .connection import DEFAULT_PORT
+from .const import CONF_DISCOVERY, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+USER_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_HOST): str,
+        vol.Optional(CONF_PORT, default=DEFAULT_PORT): int,
+        vol.Optional(CONF_DISCOVERY, default=True): bool,
+    }
+)
+
+
+class DinplugConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
+    """One config entry per controller (host/port)."""
+
+    VERSION = 1
+
+    async def async_step_user(self, user_input=None):
+        if user_input is None:
+            return self.async_show_form(step_id="user", data_schema=USER_SCHEMA)
+
+        host = user_input[CONF_HOST]
+        port = user_input[CONF_PORT]
+        await self.async_set_unique_id(f"{host}:{port}")
+        self._abort_if_unique_id_configured()
+        return self.async_create_entry(
+            title=f"DINPLUG {host}",
+            data={
+                CONF_HOST: host,
+                CONF_PORT: port,
+                CONF_DISCOVERY: user_input[CONF_DISCOVERY],
+            },
+        )
+
+    async def async_step_import(self, import_data):
+        """Create or update an entry from the top-level YAML controllers list."""
+        host = import_data[CONF_HOST]
+        port = import_data[CONF_PORT]
+        unique_id = f"{host}:{port}"
+        await self.async_set_unique_id(unique_id)
+        entry = self.hass.config_entries.async_entry_for_domain_unique_id(
+            DOMAIN, unique_id
+        )
+        if entry is not None:
+            # Replace rather than merge, so keys removed from YAML go away;
+            # the update listener reloads the entry once if anything changed
+            self.hass.config_entries.async_update_entry(entry, data=dict(import_data))
+            return self.async_abort(reason="already_configured")
+        return self.async_create_entry(title=f"DINPLUG {host}", data=dict(import_data))
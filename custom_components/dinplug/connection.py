@@ -1,9 +1,37 @@
 import asyncio
 import logging
+import time
+from collections import OrderedDict, deque
 from dataclasses import dataclass
-from typing import Callable, Dict, List, Optional, Tuple
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from homeassistant.core import is_callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 
 from .const import DOMAIN
+from .protocol import (
+    TEMP_CURRENT,
+    TEMP_EXTERNAL,
+    TEMP_TARGET,
+    ButtonEvent,
+    Event,
+    HvacFanCommand,
+    HvacFanEvent,
+    HvacModeCommand,
+    HvacModeEvent,
+    HvacSetpointCommand,
+    HvacTemperatureEvent,
+    LineDecoder,
+    LoadCommand,
+    LoadEvent,
+    ShadeCommand,
+    ShadeEvent,
+    command_target,
+    command_text,
+    encode_text,
+    parse_line,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -11,6 +39,40 @@ DEFAULT_PORT = 23
 KEEPALIVE_INTERVAL = 10
 RECONNECT_DELAY = 5
 
+# Commands issued while disconnected are held for replay after reconnect
+COMMAND_TTL = 10
+MAX_BUFFERED_COMMANDS = 256
+
+READ_CHUNK = 65536
+
+# On-demand load queries: how long to wait for the reply (and after which
+# an unanswered REFRESH is considered lost), and how old a cached level may
+# be by default before a query asks the controller
+QUERY_TIMEOUT = 5
+QUERY_MAX_AGE = 5.0
+
+# Recent RX/TX lines kept in memory for diagnostics
+TRACE_SIZE = 2000
+
+# Keys without listeners or configuration are kept in an LRU of this size
+# per kind; 0 keeps only keys something is interested in
+DEFAULT_UNKNOWN_KEY_CACHE = 1024
+
+# Key kinds reported to discovery listeners
+KIND_LOAD = "load"
+KIND_SHADE = "shade"
+KIND_BUTTON = "button"
+KIND_HVAC = "hvac"
+_KINDS = (KIND_LOAD, KIND_SHADE, KIND_BUTTON, KIND_HVAC)
+
+
+# HvacTemperatureEvent kind -> ThermostatState attribute
+_TEMP_ATTRS = {
+    TEMP_TARGET: "target_temp",
+    TEMP_CURRENT: "current_temp",
+    TEMP_EXTERNAL: "external_temp",
+}
+
 
 @dataclass
 class ThermostatState:
@@ -26,30 +88,106 @@ class ThermostatState:
 class M4Connection:
     """Single TCP/Telnet connection to the M4/DINPLUG controller."""
 
-    def __init__(self, hass, host: str, port: int):
+    def __init__(
+        self,
+        hass,
+        host: str,
+        port: int,
+        worker: bool = False,
+        unknown_key_cache: int = DEFAULT_UNKNOWN_KEY_CACHE,
+        button_bus_events: bool = False,
+    ):
         self._hass = hass
+        # References taken through get_connection
+        self._users = 0
+        self._button_bus_events = button_bus_events
         self._host = host
         self._port = port
+        self._use_worker = worker
+        self._worker = None
         self._writer: Optional[asyncio.StreamWriter] = None
         self._reader: Optional[asyncio.StreamReader] = None
         self._task: Optional[asyncio.Task] = None
+        self._keepalive_task: Optional[asyncio.Task] = None
         self._connected = False
+        # Entities stay available for COMMAND_TTL after the link drops, so
+        # service calls still reach the outbox during a short reconnect
+        self._available = False
+        self._unavailable_handle: Optional[asyncio.TimerHandle] = None
+        # target -> (command, expiry); one pending command per target
+        self._outbox: Dict[Tuple, Tuple[str, float]] = OrderedDict()
+        self._decoder = LineDecoder()
+        # (wall-clock time, "RX"/"TX", line); appends are O(1) and allocation-light
+        self._trace: deque = deque(maxlen=TRACE_SIZE)
+        self._trace_frozen = False
+        self._snapshots: Dict[str, Dict[str, Dict[Tuple[int, int], int]]] = {}
 
         self._load_listeners: Dict[Tuple[int, int], List[Callable[[int], None]]] = {}
         self._shade_listeners: Dict[Tuple[int, int], List[Callable[[int], None]]] = {}
         self._button_listeners: Dict[Tuple[int, int], List[Callable[[str], None]]] = {}
         self._thermostat_listeners: Dict[int, List[Callable[[ThermostatState], None]]] = {}
+        self._discovery_listeners: List[Callable[[str, Any], None]] = []
+        self._availability_listeners: List[Callable[[bool], None]] = []
+        self._line_listeners: List[Callable[[str], None]] = []
 
         self._last_levels: Dict[Tuple[int, int], int] = {}
+        self._last_level_times: Dict[Tuple[int, int], float] = {}
+        # One shared future per load with a query in flight
+        self._load_queries: Dict[Tuple[int, int], asyncio.Future] = {}
+        self._query_waiters: Dict[asyncio.Future, int] = {}
+        # When the REFRESH serving the current queries was sent, if any
+        self._status_sent: Optional[float] = None
         self._last_shade_levels: Dict[Tuple[int, int], int] = {}
         self._last_button_states: Dict[Tuple[int, int], str] = {}
         self._thermostats: Dict[int, ThermostatState] = {}
 
+        # Bounded caching of keys nobody listens to (see _admit)
+        self._unknown_key_cache = unknown_key_cache
+        self._declared: Dict[str, set] = {kind: set() for kind in _KINDS}
+        self._unknown: Dict[str, OrderedDict] = {
+            kind: OrderedDict() for kind in _KINDS
+        }
+        self._keys_dropped = 0
+        self._keys_evicted = 0
+        self._listeners_by_kind = {
+            KIND_LOAD: self._load_listeners,
+            KIND_SHADE: self._shade_listeners,
+            KIND_BUTTON: self._button_listeners,
+            KIND_HVAC: self._thermostat_listeners,
+        }
+
     def start(self) -> None:
         """Start background connection loop."""
+        if self._use_worker:
+            if self._worker is None:
+                # Imported here: worker.py imports this module
+                from .worker import ConnectionWorker
+
+                self._worker = ConnectionWorker(self, self._hass.loop)
+                self._worker.start()
+            return
         if self._task is None:
             self._task = self._hass.loop.create_task(self._run_loop())
 
+    async def async_stop(self) -> None:
+        """Stop the connection loop and close the socket."""
+        if self._worker is not None:
+            worker, self._worker = self._worker, None
+            await self._hass.async_add_executor_job(worker.stop)
+            self._writer = None
+            self._set_connected(False)
+        for task in (self._keepalive_task, self._task):
+            if task is not None:
+                task.cancel()
+        if self._task is not None:
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._task = None
+        self._keepalive_task = None
+        self._set_available(False)
+
     # Connection lifecycle -------------------------------------------------
 
     async def _run_loop(self):
@@ -60,29 +198,36 @@ class M4Connection:
                 self._reader, self._writer = await asyncio.open_connection(
                     self._host, self._port
                 )
-                self._connected = True
                 _LOGGER.info("M4 DINPLUG connected")
 
                 try:
-                    self.send_raw("REFRESH")
+                    self._write("REFRESH")
                 except Exception as err:
                     _LOGGER.debug("Failed to send REFRESH: %s", err)
+                self._flush_outbox()
+                self._set_connected(True)
 
-                self._hass.loop.create_task(self._keepalive_loop())
+                if self._keepalive_task is not None:
+                    self._keepalive_task.cancel()
+                self._keepalive_task = self._hass.loop.create_task(
+                    self._keepalive_loop()
+                )
 
+                self._decoder.reset()
                 while True:
-                    line = await self._reader.readline()
-                    if not line:
+                    data = await self._reader.read(READ_CHUNK)
+                    if not data:
                         raise ConnectionError("EOF from controller")
-                    text = line.decode(errors="ignore").strip()
-                    if not text:
-                        continue
-                    self._handle_line(text)
+                    for text in self._decoder.feed(data):
+                        self._handle_line(text)
 
             except Exception as err:
                 _LOGGER.warning("M4 DINPLUG connection error: %s", err)
+                if self._writer is None:
+                    # The reconnect attempt itself failed
+                    self._link_failed()
             finally:
-                self._connected = False
+                self._set_connected(False)
                 if self._writer:
                     try:
                         self._writer.close()
@@ -95,96 +240,377 @@ class M4Connection:
             _LOGGER.info("Reconnecting to M4 DINPLUG in %s seconds", RECONNECT_DELAY)
             await asyncio.sleep(RECONNECT_DELAY)
 
+    def _worker_connected(self, connected: bool) -> None:
+        """Link state reported by the worker thread, on the Home Assistant loop."""
+        if self._worker is None:
+            return
+        # Writes go through the worker, which owns the socket
+        self._writer = self._worker if connected else None
+        if connected:
+            self._flush_outbox()
+        self._set_connected(connected)
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    @property
+    def available(self) -> bool:
+        """False once the link has been down for COMMAND_TTL or a reconnect failed."""
+        return self._available
+
+    def _set_connected(self, connected: bool) -> None:
+        """Update link state; availability follows after a grace period."""
+        if connected == self._connected:
+            return
+        self._connected = connected
+        if connected:
+            self._set_available(True)
+            return
+        # The reconnect sends its own REFRESH
+        self._status_sent = None
+        if self._available and self._unavailable_handle is None:
+            self._unavailable_handle = self._hass.loop.call_later(
+                COMMAND_TTL, self._link_failed
+            )
+
+    def _link_failed(self) -> None:
+        self._set_available(False)
+
+    def _set_available(self, available: bool) -> None:
+        """Tell every entity in one pass."""
+        if self._unavailable_handle is not None:
+            self._unavailable_handle.cancel()
+            self._unavailable_handle = None
+        if available == self._available:
+            return
+        self._available = available
+        for cb in tuple(self._availability_listeners):
+            cb(available)
+
     async def _keepalive_loop(self):
         """Send STA keepalive while connected."""
         while self._connected and self._writer is not None:
             try:
-                self.send_raw("STA")
+                self._write("STA")
             except Exception as err:
                 _LOGGER.debug("Failed to send STA: %s", err)
             await asyncio.sleep(KEEPALIVE_INTERVAL)
 
     # Sending commands ----------------------------------------------------
 
-    def send_raw(self, cmd: str) -> None:
-        """Send a raw command with CRLF."""
+    def send_raw(self, cmd: str, ttl: float = COMMAND_TTL) -> None:
+        """Send a raw command, or hold it for up to ttl seconds while disconnected."""
+        if self._writer:
+            self._write(cmd)
+            return
+        self._buffer(cmd, ttl)
+
+    def _buffer(self, cmd: str, ttl: float = COMMAND_TTL) -> None:
+        target = command_target(cmd)
+        self._outbox.pop(target, None)
+        self._outbox[target] = (cmd, time.monotonic() + ttl)
+        if len(self._outbox) > MAX_BUFFERED_COMMANDS:
+            dropped, _ = self._outbox.popitem(last=False)
+            _LOGGER.debug("Outbound buffer full, dropping command for %s", dropped)
+        _LOGGER.debug("Buffered while disconnected: %s", cmd)
+
+    def send_many(self, cmds: List[str]) -> None:
+        """Send several commands in a single socket write."""
+        if not self._writer:
+            for cmd in cmds:
+                self.send_raw(cmd)
+            return
+        for cmd in cmds:
+            _LOGGER.debug("TX: %s", cmd)
+            self._record_trace("TX", cmd)
+        self._writer.write(b"".join(encode_text(cmd) for cmd in cmds))
+
+    def _write(self, cmd: str) -> None:
+        """Write a command with CRLF to the socket."""
         if not self._writer:
             raise ConnectionError("Not connected to controller")
-        msg = (cmd + "\r\n").encode()
         _LOGGER.debug("TX: %s", cmd)
-        self._writer.write(msg)
+        self._record_trace("TX", cmd)
+        self._writer.write(encode_text(cmd))
+
+    def _requeue(self, data: bytes) -> None:
+        """Buffer commands the worker could not write because the link dropped.
+
+        Buffered directly: the worker's disconnect notice may not have
+        reached this loop yet, and writing again would bounce back here.
+        """
+        for cmd in LineDecoder().feed(data):
+            # The reconnect sends its own REFRESH and keepalives
+            if cmd not in ("REFRESH", "STA"):
+                self._buffer(cmd)
+
+    def _flush_outbox(self) -> None:
+        """Replay commands buffered while disconnected, skipping expired ones."""
+        now = time.monotonic()
+        while self._outbox and self._writer:
+            _, (cmd, expires) = self._outbox.popitem(last=False)
+            if expires < now:
+                _LOGGER.debug("Dropping expired buffered command: %s", cmd)
+                continue
+            self._write(cmd)
 
     def send_load(self, device: int, channel: int, level: int, fade: Optional[int] = None):
         """Send LOAD command."""
-        level = max(0, min(100, int(level)))
-        if fade is None:
-            cmd = f"LOAD {device} {channel} {level}"
-        else:
-            cmd = f"LOAD {device} {channel} {level:03d} {fade:04d}"
-        self.send_raw(cmd)
+        self.send_raw(command_text(LoadCommand(device, channel, level, fade)))
 
     def send_switch(self, device: int, channel: int, on: bool):
         """Switch-style LOAD."""
-        level = 100 if on else 0
-        cmd = f"LOAD {device} {channel} {level}"
-        self.send_raw(cmd)
+        self.send_raw(command_text(LoadCommand(device, channel, 100 if on else 0)))
 
     def send_shade_up(self, device: int, channel: int):
-        self.send_raw(f"SHADE UP {device} {channel}")
+        self.send_raw(command_text(ShadeCommand("UP", device, channel)))
 
     def send_shade_down(self, device: int, channel: int):
-        self.send_raw(f"SHADE DOWN {device} {channel}")
+        self.send_raw(command_text(ShadeCommand("DOWN", device, channel)))
 
     def send_shade_stop(self, device: int, channel: int):
-        self.send_raw(f"SHADE STOP {device} {channel}")
+        self.send_raw(command_text(ShadeCommand("STOP", device, channel)))
 
     def send_shade_set(self, device: int, channel: int, level: int):
-        level = max(0, min(100, int(level)))
-        self.send_raw(f"SHADE SET {device} {channel} {level}")
+        self.send_raw(command_text(ShadeCommand("SET", device, channel, level)))
 
     def send_hvac_setpoint(self, device: int, temperature: float):
-        value = max(0, min(99, int(round(temperature))))
-        self.send_raw(f"HVAC SETPOINT {device} {value:02d}")
+        self.send_raw(command_text(HvacSetpointCommand(device, temperature)))
 
     def send_hvac_mode(self, device: int, mode: str):
-        mode = mode.upper()
-        if mode not in {"HEAT", "COOL", "OFF"}:
-            raise ValueError(f"Unsupported HVAC mode {mode}")
-        self.send_raw(f"HVAC {mode} {device}")
+        self.send_raw(command_text(HvacModeCommand(device, mode)))
 
     def send_hvac_fan_mode(self, device: int, fan_mode: str):
-        mode = fan_mode.upper()
-        if mode not in {"FANHIGH", "FANMID", "FANLOW", "FANAUTO"}:
-            raise ValueError(f"Unsupported fan mode {fan_mode}")
-        self.send_raw(f"HVAC {mode} {device}")
+        self.send_raw(command_text(HvacFanCommand(device, fan_mode)))
+
+    # Snapshots -----------------------------------------------------------
+
+    def snapshot(self, name: str, devices: Optional[List[int]] = None) -> int:
+        """Store the cached load and shade levels (optionally for some devices)."""
+        wanted = set(devices) if devices else None
+        loads = {
+            key: level
+            for key, level in self._last_levels.items()
+            if wanted is None or key[0] in wanted
+        }
+        shades = {
+            key: level
+            for key, level in self._last_shade_levels.items()
+            if wanted is None or key[0] in wanted
+        }
+        self._snapshots[name] = {"loads": loads, "shades": shades}
+        return len(loads) + len(shades)
+
+    def restore(self, name: str, fade: Optional[int] = None) -> int:
+        """Replay only the snapshot entries that differ from the cache; return the count."""
+        snap = self._snapshots.get(name)
+        if snap is None:
+            raise KeyError(name)
+        cmds = [
+            command_text(LoadCommand(dev, ch, level, fade))
+            for (dev, ch), level in snap["loads"].items()
+            if self._last_levels.get((dev, ch)) != level
+        ]
+        cmds.extend(
+            command_text(ShadeCommand("SET", dev, ch, level))
+            for (dev, ch), level in snap["shades"].items()
+            if self._last_shade_levels.get((dev, ch)) != level
+        )
+        if cmds:
+            self.send_many(cmds)
+        return len(cmds)
+
+    def snapshot_names(self) -> List[str]:
+        return list(self._snapshots)
+
+    # RX/TX trace ---------------------------------------------------------
+
+    @property
+    def host(self) -> str:
+        return self._host
+
+    @property
+    def port(self) -> int:
+        return self._port
+
+    @property
+    def trace_frozen(self) -> bool:
+        return self._trace_frozen
+
+    def freeze_trace(self, frozen: bool = True) -> None:
+        """Stop (or resume) recording so the current history is preserved."""
+        self._trace_frozen = frozen
+
+    def get_trace(self) -> List[Tuple[float, str, str]]:
+        return list(self._trace)
+
+    def _record_trace(self, direction: str, text: str) -> None:
+        # deque.append is atomic, so the worker thread may record directly
+        if not self._trace_frozen:
+            self._trace.append((time.time(), direction, text))
 
     # Listener registration -----------------------------------------------
 
+    def _loop_safe(self, callback: Callable) -> Callable:
+        """Run @callback listeners inline on the loop; route anything else via add_job."""
+        if is_callback(callback):
+            return callback
+        return partial(self._hass.add_job, callback)
+
     def register_load_listener(
         self, device: int, channel: int, callback: Callable[[int], None]
-    ):
-        self._load_listeners.setdefault((device, channel), []).append(callback)
+    ) -> Callable[[], None]:
+        return self._add_keyed_listener(KIND_LOAD, (device, channel), callback)
 
     def register_shade_listener(
         self, device: int, channel: int, callback: Callable[[int], None]
-    ):
-        self._shade_listeners.setdefault((device, channel), []).append(callback)
+    ) -> Callable[[], None]:
+        return self._add_keyed_listener(KIND_SHADE, (device, channel), callback)
 
     def register_button_listener(
         self, device: int, button: int, callback: Callable[[str], None]
-    ):
-        self._button_listeners.setdefault((device, button), []).append(callback)
+    ) -> Callable[[], None]:
+        return self._add_keyed_listener(KIND_BUTTON, (device, button), callback)
 
     def register_thermostat_listener(
         self, device: int, callback: Callable[[ThermostatState], None]
-    ):
-        self._thermostat_listeners.setdefault(device, []).append(callback)
+    ) -> Callable[[], None]:
+        return self._add_keyed_listener(KIND_HVAC, device, callback)
+
+    def _add_keyed_listener(
+        self, kind: str, key: Any, callback: Callable
+    ) -> Callable[[], None]:
+        """Index a listener under its key; returns an unsubscribe.
+
+        The key is dropped from the index with its last listener, so it is
+        no longer treated as wanted by _admit.
+        """
+        self._unknown[kind].pop(key, None)
+        index = self._listeners_by_kind[kind]
+        listener = self._loop_safe(callback)
+        index.setdefault(key, []).append(listener)
+
+        def _remove() -> None:
+            listeners = index.get(key)
+            if listeners and listener in listeners:
+                listeners.remove(listener)
+                if not listeners:
+                    del index[key]
+
+        return _remove
+
+    def declare_keys(self, keys: Dict[str, Any]) -> None:
+        """Mark configured keys as wanted before their entities register listeners."""
+        for kind, kind_keys in keys.items():
+            self._declared[kind].update(kind_keys)
+            for key in kind_keys:
+                self._unknown[kind].pop(key, None)
+
+    @property
+    def cache_stats(self) -> Dict[str, Any]:
+        return {
+            "unknown_key_cache": self._unknown_key_cache,
+            "unknown_keys": {kind: len(keys) for kind, keys in self._unknown.items()},
+            "dropped": self._keys_dropped,
+            "evicted": self._keys_evicted,
+        }
+
+    def register_availability_listener(
+        self, callback: Callable[[bool], None]
+    ) -> Callable[[], None]:
+        """Call back (in the event loop) whenever availability changes."""
+        self._availability_listeners.append(callback)
+        return lambda: self._availability_listeners.remove(callback)
+
+    @property
+    def has_line_listeners(self) -> bool:
+        return bool(self._line_listeners)
+
+    def register_line_listener(self, callback: Callable[[str], None]) -> Callable[[], None]:
+        """Call back synchronously with every raw line received; returns an unsubscribe."""
+        self._line_listeners.append(callback)
+        return lambda: self._line_listeners.remove(callback)
+
+    def register_discovery_listener(
+        self, callback: Callable[[str, Any], None]
+    ) -> Callable[[], None]:
+        """Call back with (kind, key) the first time the controller reports a key."""
+        listener = self._loop_safe(callback)
+        self._discovery_listeners.append(listener)
+        return lambda: self._discovery_listeners.remove(listener)
 
     # Cached states -------------------------------------------------------
 
     def get_last_level(self, device: int, channel: int) -> Optional[int]:
         return self._last_levels.get((device, channel))
 
+    def is_load_queried(self, device: int, channel: int) -> bool:
+        return (device, channel) in self._load_queries
+
+    async def async_query_load(
+        self,
+        device: int,
+        channel: int,
+        max_age: float = QUERY_MAX_AGE,
+        timeout: float = QUERY_TIMEOUT,
+    ) -> int:
+        """Return a level reported at most max_age seconds ago, asking if needed.
+
+        The protocol has no per-load status request: a cache miss costs a
+        full REFRESH, which makes the controller report every key. Pass the
+        largest max_age the caller can accept; 0 always asks. Concurrent
+        queries share one outstanding REFRESH. Raises ConnectionError when
+        disconnected and asyncio.TimeoutError if the controller does not
+        report the load in time.
+        """
+        key = (device, channel)
+        stamp = self._last_level_times.get(key)
+        if stamp is not None and time.monotonic() - stamp <= max_age:
+            return self._last_levels[key]
+
+        query = self._load_queries.get(key)
+        if query is None:
+            if not self._connected:
+                raise ConnectionError("Not connected to controller")
+            query = self._load_queries[key] = self._hass.loop.create_future()
+            self._request_status(key)
+        self._query_waiters[query] = self._query_waiters.get(query, 0) + 1
+        try:
+            # Shielded: one caller timing out must not cancel the others
+            return await asyncio.wait_for(asyncio.shield(query), timeout)
+        finally:
+            self._query_waiters[query] -= 1
+            if not self._query_waiters[query]:
+                del self._query_waiters[query]
+                # The last waiter gave up: nobody is left to resolve it for
+                if self._load_queries.get(key) is query:
+                    del self._load_queries[key]
+                    self._status_settled()
+
+    def _request_status(self, key: Tuple[int, int]) -> None:
+        """Ask the controller to report its loads, unless a REFRESH is on its way.
+
+        The protocol has no per-load status request, so REFRESH is the
+        targeted query. Queries share an outstanding REFRESH as long as it
+        has not reported their load yet; one unanswered for QUERY_TIMEOUT
+        is considered lost.
+        """
+        now = time.monotonic()
+        sent = self._status_sent
+        if (
+            sent is not None
+            and now - sent < QUERY_TIMEOUT
+            and self._last_level_times.get(key, 0.0) < sent
+        ):
+            return
+        self._status_sent = now
+        self._write("REFRESH")
+
+    def _status_settled(self) -> None:
+        if not self._load_queries:
+            self._status_sent = None
+
     def get_last_shade_level(self, device: int, channel: int) -> Optional[int]:
         return self._last_shade_levels.get((device, channel))
 
@@ -194,155 +620,256 @@ class M4Connection:
     def get_last_thermostat_state(self, device: int) -> Optional[ThermostatState]:
         return self._thermostats.get(device)
 
-    # Incoming parsing ----------------------------------------------------
+    def known_keys(self, kind: str) -> List[Any]:
+        """Return every key of the given kind seen since startup."""
+        cache = {
+            KIND_LOAD: self._last_levels,
+            KIND_SHADE: self._last_shade_levels,
+            KIND_BUTTON: self._last_button_states,
+            KIND_HVAC: self._thermostats,
+        }[kind]
+        return list(cache)
+
+    def cached_report_lines(self) -> List[str]:
+        """Render the cached state as the R: lines a REFRESH would produce."""
+        lines = [
+            f"R:LOAD {dev} {ch} {level}" for (dev, ch), level in self._last_levels.items()
+        ]
+        lines.extend(
+            f"R:SHADE {dev} {ch} {level}"
+            for (dev, ch), level in self._last_shade_levels.items()
+        )
+        for dev, state in self._thermostats.items():
+            if state.target_temp is not None:
+                lines.append(f"R:HVAC SETPOINT {dev} {state.target_temp:g}")
+            if state.current_temp is not None:
+                lines.append(f"R:HVAC CURRENTTEMP {dev} {state.current_temp:g}")
+            if state.external_temp is not None:
+                lines.append(f"R:HVAC EXTERNALTEMP {dev} {state.external_temp:g}")
+            if state.hvac_mode is not None:
+                lines.append(f"R:HVAC {state.hvac_mode} {dev}")
+            if state.fan_mode is not None:
+                lines.append(f"R:HVAC {state.fan_mode} {dev}")
+        return lines
+
+    # Incoming events ---------------------------------------------------
 
     def _handle_line(self, text: str) -> None:
-        """Parse incoming lines and dispatch."""
+        """Parse an incoming line and dispatch."""
         _LOGGER.debug("RX: %s", text)
-
-        if text.startswith("R:LOAD "):
-            self._parse_load(text)
-        elif text.startswith("R:SHADE "):
-            self._parse_shade(text)
-        elif text.startswith("R:BTN "):
-            self._parse_button(text)
-        elif text.startswith("R:HVAC"):
-            self._parse_hvac(text)
-
-    def _parse_load(self, text: str) -> None:
-        parts = text.split()
-        if len(parts) < 4:
-            return
-        try:
-            dev = int(parts[1])
-            ch = int(parts[2])
-            level = int(parts[3])
-        except ValueError:
-            return
-
-        if level < 0 or level > 100:
-            _LOGGER.debug(
-                "Ignoring out-of-range level for dev=%s ch=%s: %s", dev, ch, level
-            )
-            return
-
-        key = (dev, ch)
-        self._last_levels[key] = level
-
-        for cb in self._load_listeners.get(key, []):
-            self._hass.add_job(cb, level)
-
-    def _parse_shade(self, text: str) -> None:
-        parts = text.split()
-        if len(parts) < 4:
-            return
-        try:
-            dev = int(parts[1])
-            ch = int(parts[2])
-            level = int(parts[3])
-        except ValueError:
-            return
-
-        if level < 0 or level > 100:
-            _LOGGER.debug(
-                "Ignoring out-of-range shade level for dev=%s ch=%s: %s", dev, ch, level
-            )
-            return
-
-        key = (dev, ch)
-        self._last_shade_levels[key] = level
-        for cb in self._shade_listeners.get(key, []):
-            self._hass.add_job(cb, level)
-
-    def _parse_button(self, text: str) -> None:
-        # Example: R:BTN PRESS 111 2
-        parts = text.split()
-        if len(parts) < 4:
-            return
-        state = parts[1].upper()
-        try:
-            dev = int(parts[2])
-            btn = int(parts[3])
-        except ValueError:
-            return
-
-        key = (dev, btn)
-        self._last_button_states[key] = state
-        for cb in self._button_listeners.get(key, []):
-            self._hass.add_job(cb, state)
-
-        self._hass.bus.async_fire(
-            f"{DOMAIN}_button_event",
-            {"device": dev, "button": btn, "state": state},
+        self._record_trace("RX", text)
+        for cb in self._line_listeners:
+            cb(text)
+        event = parse_line(text)
+        if event is not None:
+            self._handle_event(event)
+
+    def _apply_batch(
+        self,
+        events: List[Event],
+        lines: List[str],
+        touched: List[Tuple[int, int]],
+    ) -> None:
+        """Apply a batch of deduplicated events from the worker thread.
+
+        touched lists loads reported again with an unchanged level; only
+        their report time is updated.
+        """
+        for text in lines:
+            for cb in self._line_listeners:
+                cb(text)
+        now = time.monotonic()
+        for key in touched:
+            if key in self._last_level_times:
+                self._last_level_times[key] = now
+        for event in events:
+            self._handle_event(event)
+
+    def _handle_event(self, event: Event) -> None:
+        if isinstance(event, LoadEvent):
+            self._handle_load(event)
+        elif isinstance(event, ShadeEvent):
+            self._handle_shade(event)
+        elif isinstance(event, ButtonEvent):
+            self._handle_button(event)
+        elif isinstance(event, HvacTemperatureEvent):
+            self._handle_hvac_temp(event)
+        elif isinstance(event, HvacModeEvent):
+            state = self._thermostat(event.device)
+            if state is not None:
+                state.hvac_mode = event.mode
+                self._notify_thermostat(event.device)
+        elif isinstance(event, HvacFanEvent):
+            state = self._thermostat(event.device)
+            if state is not None:
+                state.fan_mode = event.fan_mode
+                self._notify_thermostat(event.device)
+
+    def _handle_load(self, event: LoadEvent) -> None:
+        key = (event.device, event.channel)
+        if key not in self._last_levels:
+            self._notify_discovery(KIND_LOAD, key)
+        if self._admit(KIND_LOAD, key, self._last_levels):
+            self._last_levels[key] = event.level
+            self._last_level_times[key] = time.monotonic()
+        query = self._load_queries.pop(key, None)
+        if query is not None:
+            if not query.done():
+                query.set_result(event.level)
+            self._status_settled()
+
+        for cb in self._load_listeners.get(key, ()):
+            cb(event.level)
+
+    def _handle_shade(self, event: ShadeEvent) -> None:
+        key = (event.device, event.channel)
+        if key not in self._last_shade_levels:
+            self._notify_discovery(KIND_SHADE, key)
+        if self._admit(KIND_SHADE, key, self._last_shade_levels):
+            self._last_shade_levels[key] = event.level
+        for cb in self._shade_listeners.get(key, ()):
+            cb(event.level)
+
+    def _handle_button(self, event: ButtonEvent) -> None:
+        key = (event.device, event.button)
+        previous = self._last_button_states.get(key)
+        if previous is None:
+            self._notify_discovery(KIND_BUTTON, key)
+        if self._admit(KIND_BUTTON, key, self._last_button_states):
+            self._last_button_states[key] = event.state
+        # Copy: a listener may unsubscribe from inside its callback
+        for cb in tuple(self._button_listeners.get(key, ())):
+            cb(event.state)
+        # Device triggers listen by signal, which outlives this connection
+        async_dispatcher_send(
+            self._hass,
+            signal_button(self._host, self._port, event.device, event.button),
+            event.state,
         )
 
-    def _parse_hvac(self, text: str) -> None:
-        parts = text.split()
-        if len(parts) < 3:
-            return
-        keyword = parts[1].upper()
+        # Opt-in: every bus event is recorded; a held key's repeats fire once
+        if self._button_bus_events and not (
+            event.state == "HOLD" and previous == "HOLD"
+        ):
+            self._hass.bus.async_fire(
+                f"{DOMAIN}_button_event",
+                {"device": event.device, "button": event.button, "state": event.state},
+            )
 
-        # Messages with temperature
-        if keyword in {"SETPOINT", "COOLPOINT", "HEATPOINT"} and len(parts) >= 4:
-            self._update_thermostat_temp(parts[2], parts[3], target=True)
-            return
-        if keyword in {"CURRENTTEMP", "EXTERNALTEMP"} and len(parts) >= 4:
-            self._update_thermostat_temp(parts[2], parts[3], target=False, external=keyword == "EXTERNALTEMP")
+    def _handle_hvac_temp(self, event: HvacTemperatureEvent) -> None:
+        state = self._thermostat(event.device)
+        attr = _TEMP_ATTRS.get(event.kind)
+        if state is None or attr is None:
             return
-
-        # HVAC mode / fan mode
-        if keyword in {"COOL", "HEAT", "FAN", "OFF"} and len(parts) >= 3:
-            try:
-                dev = int(parts[2])
-            except ValueError:
-                return
-            state = self._thermostats.setdefault(dev, ThermostatState())
-            state.hvac_mode = keyword
-            self._notify_thermostat(dev)
+        # Thermostats repeat unchanged readings; only changes reach entities
+        if getattr(state, attr) == event.value:
             return
+        setattr(state, attr, event.value)
+        self._notify_thermostat(event.device)
 
-        if keyword in {"FANHIGH", "FANMID", "FANLOW", "FANAUTO"} and len(parts) >= 3:
-            try:
-                dev = int(parts[2])
-            except ValueError:
-                return
-            state = self._thermostats.setdefault(dev, ThermostatState())
-            state.fan_mode = keyword
-            self._notify_thermostat(dev)
-
-    def _update_thermostat_temp(
-        self, dev_raw: str, value_raw: str, target: bool, external: bool = False
-    ) -> None:
-        try:
-            dev = int(dev_raw)
-            value = float(value_raw)
-        except ValueError:
-            return
-
-        state = self._thermostats.setdefault(dev, ThermostatState())
-        if target:
-            state.target_temp = value
+    def _thermostat(self, dev: int) -> Optional[ThermostatState]:
+        """State for a thermostat, or None if it is not cached (see _admit)."""
+        state = self._thermostats.get(dev)
+        if state is None:
+            self._notify_discovery(KIND_HVAC, dev)
+            if not self._admit(KIND_HVAC, dev, self._thermostats):
+                return None
+            state = self._thermostats[dev] = ThermostatState()
         else:
-            if external:
-                state.external_temp = value
-            else:
-                state.current_temp = value
-        self._notify_thermostat(dev)
+            self._admit(KIND_HVAC, dev, self._thermostats)
+        return state
+
+    def _admit(self, kind: str, key: Any, cache: Dict) -> bool:
+        """Decide whether a reported key may be stored in its cache.
+
+        Keys with listeners, declared in configuration or being queried are
+        always kept. Other keys live in a per-kind LRU of unknown_key_cache
+        entries, and the least recently reported one is evicted when it is
+        full. With a limit of 0 they are not stored at all.
+        """
+        unknown = self._unknown[kind]
+        if key in unknown:
+            unknown.move_to_end(key)
+            return True
+        if (
+            key in self._listeners_by_kind[kind]
+            or key in self._declared[kind]
+            or key in cache
+            or (kind == KIND_LOAD and key in self._load_queries)
+        ):
+            return True
+        if not self._unknown_key_cache:
+            self._keys_dropped += 1
+            return False
+        unknown[key] = None
+        if len(unknown) > self._unknown_key_cache:
+            oldest, _ = unknown.popitem(last=False)
+            cache.pop(oldest, None)
+            if kind == KIND_LOAD:
+                self._last_level_times.pop(oldest, None)
+            self._keys_evicted += 1
+        return True
+
+    def _notify_discovery(self, kind: str, key: Any) -> None:
+        for cb in self._discovery_listeners:
+            cb(kind, key)
 
     def _notify_thermostat(self, device: int) -> None:
         state = self._thermostats.get(device)
         if state is None:
             return
-        for cb in self._thermostat_listeners.get(device, []):
-            self._hass.add_job(cb, state)
+        for cb in self._thermostat_listeners.get(device, ()):
+            cb(state)
+
+
+def signal_button(host: str, port: int, device: int, button: int) -> str:
+    """Dispatcher signal carrying the R:BTN states of one keypad button."""
+    return f"{DOMAIN}_button_{host}_{port}_{device}_{button}"
 
 
-def get_connection(hass, host: str, port: int) -> M4Connection:
-    """Return a shared connection per host/port."""
+def get_connection(
+    hass,
+    host: str,
+    port: int,
+    worker: bool = False,
+    unknown_key_cache: int = DEFAULT_UNKNOWN_KEY_CACHE,
+    button_bus_events: bool = False,
+) -> M4Connection:
+    """Return a shared connection per host/port; the first caller picks the options.
+
+    Every call takes a reference, which async_release_connection drops.
+    YAML platforms (light:/cover:/... platform: dinplug) never release
+    theirs, so a controller entry reload keeps their link up.
+    """
     hass.data.setdefault(DOMAIN, {})
     key = (host, port)
     if key not in hass.data[DOMAIN]:
-        conn = M4Connection(hass, host, port)
+        conn = M4Connection(
+            hass, host, port, worker, unknown_key_cache, button_bus_events
+        )
         hass.data[DOMAIN][key] = conn
         conn.start()
-    return hass.data[DOMAIN][key]
+    conn = hass.data[DOMAIN][key]
+    conn._users += 1
+    return conn
+
+
+def iter_connections(hass) -> List[M4Connection]:
+    """Return every shared connection."""
+    return [
+        conn
+        for key, conn in hass.data.get(DOMAIN, {}).items()
+        if isinstance(key, tuple)
+    ]
+
+
+async def async_release_connection(hass, host: str, port: int) -> None:
+    """Drop a reference; the last one stops and forgets the connection."""
+    connections = hass.data.get(DOMAIN, {})
+    conn = connections.get((host, port))
+    if conn is None:
+        return
+    conn._users -= 1
+    if conn._users <= 0:
+        del connections[(host, port)]
+        await conn.async_stop()
@@ -1,5 +1,9 @@
 DOMAIN = "dinplug"
 
+PLATFORMS = ["light", "cover", "climate", "sensor", "event"]
+
+CONF_CONTROLLERS = "controllers"
+
 CONF_LIGHTS = "lights"
 CONF_COVERS = "covers"
 CONF_HVACS = "hvac"
@@ -8,5 +12,30 @@ CONF_DEVICE = "device"
 CONF_CHANNEL = "channel"
 CONF_DIMMER = "dimmer"
 CONF_BUTTON_ID = "button"
+CONF_BUTTON_SENSORS = "button_sensors"
 CONF_MIN_TEMP = "min_temp"
 CONF_MAX_TEMP = "max_temp"
+CONF_TEMP_DEADBAND = "temperature_deadband"
+CONF_TEMP_MIN_INTERVAL = "temperature_min_interval"
+CONF_DEFAULT_TRANSITION = "default_transition"
+CONF_OPEN_TIME = "open_time"
+CONF_CLOSE_TIME = "close_time"
+CONF_MIN_WRITE_INTERVAL = "min_write_interval"
+CONF_DISCOVERY = "discovery"
+CONF_PROXY_PORT = "proxy_port"
+CONF_PROXY_BIND = "proxy_bind"
+CONF_WORKER_THREAD = "worker_thread"
+CONF_UNKNOWN_KEY_CACHE = "unknown_key_cache"
+CONF_BUTTON_BUS_EVENTS = "button_bus_events"
+CONF_WATTS = "watts"
+CONF_POWER_GROUPS = "power_groups"
+
+
+def keypad_identifier(host: str, port: int, device: int) -> str:
+    """Device-registry identifier for one keypad/module on a controller."""
+    return f"{host}:{port}:{device}"
+
+
+def parse_keypad_identifier(identifier: str):
+    host, port, device = identifier.rsplit(":", 2)
+    return host, int(port), int(device)
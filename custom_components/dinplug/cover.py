@@ -1,58 +1,119 @@
 import logging
+import time
+from datetime import timedelta
 from typing import Optional
 
 import voluptuous as vol
 
 from homeassistant.components.cover import (
+    ATTR_POSITION,
     PLATFORM_SCHEMA,
     CoverEntity,
     CoverEntityFeature,
 )
 from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PORT
+from homeassistant.core import callback
 import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.event import async_track_time_interval
 
-from .connection import DEFAULT_PORT, M4Connection, get_connection
-from .const import CONF_CHANNEL, CONF_COVERS, CONF_DEVICE
+from .connection import DEFAULT_PORT, KIND_SHADE, M4Connection, get_connection
+from .const import (
+    CONF_CHANNEL,
+    CONF_CLOSE_TIME,
+    CONF_COVERS,
+    CONF_DEVICE,
+    CONF_MIN_WRITE_INTERVAL,
+    CONF_OPEN_TIME,
+    DOMAIN,
+)
+from .discovery import async_setup_discovered
+from .entity import M4Entity
+from .startup import bulk_list, profiled
 
 _LOGGER = logging.getLogger(__name__)
 
+# Upper bound on how often a moving cover writes its estimated position
+ESTIMATE_INTERVAL = timedelta(seconds=1)
+
 COVER_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_NAME): cv.string,
         vol.Required(CONF_DEVICE): vol.Coerce(int),
         vol.Required(CONF_CHANNEL): vol.Coerce(int),
+        vol.Optional(CONF_OPEN_TIME): vol.All(vol.Coerce(float), vol.Range(min=0.1)),
+        vol.Optional(CONF_CLOSE_TIME): vol.All(vol.Coerce(float), vol.Range(min=0.1)),
+        vol.Optional(CONF_MIN_WRITE_INTERVAL, default=0): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
     }
 )
 
+COVERS_SCHEMA = bulk_list(
+    "covers", COVER_SCHEMA, {CONF_NAME: str, CONF_DEVICE: int, CONF_CHANNEL: int}
+)
+
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     {
         vol.Required(CONF_HOST): cv.string,
         vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
-        vol.Required(CONF_COVERS): vol.All(cv.ensure_list, [COVER_SCHEMA]),
+        vol.Required(CONF_COVERS): COVERS_SCHEMA,
     }
 )
 
 
+@profiled("cover")
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     """Set up dinplug covers (shades) from YAML."""
     host = config[CONF_HOST]
     port = config[CONF_PORT]
-    covers_conf = config[CONF_COVERS]
-
     conn = get_connection(hass, host, port)
+    async_add_entities(_build_entities(conn, host, port, config[CONF_COVERS]))
+
+
+@profiled("cover")
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Set up dinplug covers (shades) from a config entry."""
+    conn = hass.data[DOMAIN][entry.entry_id]
+    host = entry.data[CONF_HOST]
+    port = entry.data[CONF_PORT]
+    async_add_entities(
+        _build_entities(conn, host, port, entry.data.get(CONF_COVERS, []))
+    )
+
+    def _discovered(key) -> M4Cover:
+        dev, ch = key
+        name = f"DINPLUG Shade {dev}:{ch}"
+        return M4Cover(conn, host, port, name, dev, ch, discovered=True)
 
+    async_setup_discovered(hass, entry, KIND_SHADE, async_add_entities, _discovered)
+
+
+def _build_entities(conn: M4Connection, host: str, port: int, confs) -> list:
     entities = []
-    for cfg in covers_conf:
+    for cfg in confs:
         name = cfg[CONF_NAME]
         dev = cfg[CONF_DEVICE]
         ch = cfg[CONF_CHANNEL]
-        entities.append(M4Cover(conn, host, port, name, dev, ch))
-
-    async_add_entities(entities, update_before_add=True)
+        open_time = cfg.get(CONF_OPEN_TIME)
+        close_time = cfg.get(CONF_CLOSE_TIME, open_time)
+        min_write_interval = cfg.get(CONF_MIN_WRITE_INTERVAL, 0)
+        entities.append(
+            M4Cover(
+                conn,
+                host,
+                port,
+                name,
+                dev,
+                ch,
+                open_time,
+                close_time,
+                min_write_interval,
+            )
+        )
+    return entities
 
 
-class M4Cover(CoverEntity):
-    _attr_should_poll = False
+class M4Cover(M4Entity, CoverEntity):
     _attr_supported_features = (
         CoverEntityFeature.OPEN
         | CoverEntityFeature.CLOSE
@@ -68,6 +129,10 @@ class M4Cover(CoverEntity):
         name: str,
         device: int,
         channel: int,
+        open_time: Optional[float] = None,
+        close_time: Optional[float] = None,
+        min_write_interval: float = 0.0,
+        discovered: bool = False,
     ):
         self._conn = conn
         self._host = host
@@ -75,12 +140,27 @@ class M4Cover(CoverEntity):
         self._attr_name = name
         self._device = device
         self._channel = channel
+        self._open_time = open_time
+        self._close_time = close_time
+        self._min_write_interval = min_write_interval
+        self._attr_entity_registry_enabled_default = not discovered
 
         self._position: Optional[int] = None
         self._attr_unique_id = f"{self._host}-{self._port}-shade-{self._device}-{self._channel}"
 
-        self._conn.register_shade_listener(
-            self._device, self._channel, self._handle_shade_update
+        # Travel estimation: direction is +1 (opening), -1 (closing) or 0
+        self._direction = 0
+        self._move_start: float = 0.0
+        self._move_from: float = 0.0
+        self._move_target: int = 0
+        self._unsub_estimate = None
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._conn.register_shade_listener(
+                self._device, self._channel, self._handle_shade_update
+            )
         )
 
         last = self._conn.get_last_shade_level(self._device, self._channel)
@@ -93,10 +173,19 @@ class M4Cover(CoverEntity):
             return None
         return self._position == 0
 
+    @property
+    def is_opening(self) -> bool:
+        return self._direction > 0
+
+    @property
+    def is_closing(self) -> bool:
+        return self._direction < 0
+
     @property
     def current_cover_position(self) -> Optional[int]:
         return self._position
 
+    @callback
     def _handle_shade_update(self, level: int) -> None:
         if level < 0 or level > 100:
             _LOGGER.debug(
@@ -108,19 +197,95 @@ class M4Cover(CoverEntity):
             return
 
         self._position = level
-        self.schedule_update_ha_state()
+        final = False
+        if self._direction:
+            if level == self._move_target:
+                self._stop_estimate()
+                final = True
+            else:
+                # Re-anchor the estimate on the controller's reported position
+                self._move_from = level
+                self._move_start = time.monotonic()
+        self._async_write_limited(final)
+
+    async def async_will_remove_from_hass(self) -> None:
+        await super().async_will_remove_from_hass()
+        self._stop_estimate()
+
+    # ---- Travel estimation ----
+
+    def _travel_time(self, direction: int) -> Optional[float]:
+        return self._open_time if direction > 0 else self._close_time
+
+    def _start_estimate(self, target: int) -> None:
+        """Begin interpolating position toward target, if travel times are known."""
+        if self._position is None or self.hass is None:
+            return
+        if self._direction:
+            self._position = self._estimated_position()
+        direction = (target > self._position) - (target < self._position)
+        if not direction or self._travel_time(direction) is None:
+            self._stop_estimate()
+            return
+
+        self._direction = direction
+        self._move_from = self._position
+        self._move_target = target
+        self._move_start = time.monotonic()
+        if self._unsub_estimate is None:
+            self._unsub_estimate = async_track_time_interval(
+                self.hass, self._async_update_estimate, ESTIMATE_INTERVAL
+            )
+        self.async_write_ha_state()
+
+    def _stop_estimate(self) -> None:
+        self._direction = 0
+        if self._unsub_estimate is not None:
+            self._unsub_estimate()
+            self._unsub_estimate = None
+
+    def _estimated_position(self) -> int:
+        travel = self._travel_time(self._direction)
+        elapsed = time.monotonic() - self._move_start
+        moved = 100.0 * elapsed / travel
+        position = self._move_from + self._direction * moved
+        if self._direction > 0:
+            position = min(position, self._move_target)
+        else:
+            position = max(position, self._move_target)
+        return int(round(position))
+
+    @callback
+    def _async_update_estimate(self, _now) -> None:
+        if not self._direction:
+            self._stop_estimate()
+            return
+        self._position = self._estimated_position()
+        final = self._position == self._move_target
+        if final:
+            self._stop_estimate()
+        self._async_write_limited(final)
+
+    # ---- Commands from HA ----
 
     async def async_open_cover(self, **kwargs):
         self._conn.send_shade_up(self._device, self._channel)
+        self._start_estimate(100)
 
     async def async_close_cover(self, **kwargs):
         self._conn.send_shade_down(self._device, self._channel)
+        self._start_estimate(0)
 
     async def async_stop_cover(self, **kwargs):
         self._conn.send_shade_stop(self._device, self._channel)
+        if self._direction:
+            self._position = self._estimated_position()
+            self._stop_estimate()
+            self.async_write_ha_state()
 
     async def async_set_cover_position(self, **kwargs):
-        if "position" not in kwargs:
+        if ATTR_POSITION not in kwargs:
             return
-        level = max(0, min(100, int(kwargs["position"])))
+        level = max(0, min(100, int(kwargs[ATTR_POSITION])))
         self._conn.send_shade_set(self._device, self._channel, level)
+        self._start_estimate(level)
@@ -0,0 +1,112 @@
+"""Device triggers for keypad buttons.
+
+Triggers are listed for every button with a sensor or event entity on the
+keypad device. Each attached trigger listens to the dispatcher signal of
+its (host, port, device, button), so a key press only reaches the
+automations bound to that button, and triggers keep working when the
+controller's connection is replaced by a reload.
+"""
+
+import voluptuous as vol
+
+from homeassistant.components.device_automation import DEVICE_TRIGGER_BASE_SCHEMA
+from homeassistant.const import CONF_DEVICE_ID, CONF_DOMAIN, CONF_PLATFORM, CONF_TYPE
+from homeassistant.core import HassJob, callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .connection import signal_button
+from .const import DOMAIN, parse_keypad_identifier
+
+CONF_SUBTYPE = "subtype"
+
+# Trigger type -> controller R:BTN state
+TRIGGER_TYPES = {
+    "press": "PRESS",
+    "release": "RELEASE",
+    "hold": "HOLD",
+    "double": "DOUBLE",
+}
+
+TRIGGER_SCHEMA = DEVICE_TRIGGER_BASE_SCHEMA.extend(
+    {
+        vol.Required(CONF_TYPE): vol.In(TRIGGER_TYPES),
+        vol.Required(CONF_SUBTYPE): vol.Coerce(int),
+    }
+)
+
+
+def _keypad(hass, device_id: str):
+    """Return (host, port, device) for a keypad device, or None."""
+    device = dr.async_get(hass).async_get(device_id)
+    if device is None:
+        return None
+    for domain, identifier in device.identifiers:
+        if domain == DOMAIN:
+            return parse_keypad_identifier(identifier)
+    return None
+
+
+def _buttons(hass, device_id: str):
+    """Button numbers of the button entities attached to the device."""
+    buttons = set()
+    registry = er.async_get(hass)
+    for entry in er.async_entries_for_device(
+        registry, device_id, include_disabled_entities=True
+    ):
+        if entry.platform == DOMAIN and "-button-" in entry.unique_id:
+            buttons.add(int(entry.unique_id.rsplit("-", 1)[1]))
+    return sorted(buttons)
+
+
+async def async_get_triggers(hass, device_id: str):
+    """List a trigger for every gesture of every button on the keypad."""
+    if _keypad(hass, device_id) is None:
+        return []
+    return [
+        {
+            CONF_PLATFORM: "device",
+            CONF_DOMAIN: DOMAIN,
+            CONF_DEVICE_ID: device_id,
+            CONF_TYPE: trigger_type,
+            CONF_SUBTYPE: button,
+        }
+        for button in _buttons(hass, device_id)
+        for trigger_type in TRIGGER_TYPES
+    ]
+
+
+async def async_attach_trigger(hass, config, action, trigger_info):
+    """Listen to the button's signal, whichever connection sends it."""
+    keypad = _keypad(hass, config[CONF_DEVICE_ID])
+    if keypad is None:
+        return lambda: None
+    host, port, device = keypad
+
+    button = config[CONF_SUBTYPE]
+    wanted = TRIGGER_TYPES[config[CONF_TYPE]]
+    job = HassJob(action)
+    trigger_data = trigger_info["trigger_data"]
+
+    @callback
+    def _handle_button(state: str) -> None:
+        if state != wanted:
+            return
+        hass.async_run_hass_job(
+            job,
+            {
+                "trigger": {
+                    **trigger_data,
+                    CONF_PLATFORM: "device",
+                    CONF_DOMAIN: DOMAIN,
+                    CONF_DEVICE_ID: config[CONF_DEVICE_ID],
+                    CONF_TYPE: config[CONF_TYPE],
+                    CONF_SUBTYPE: button,
+                    "description": f"keypad {device} button {button} {config[CONF_TYPE]}",
+                }
+            },
+        )
+
+    return async_dispatcher_connect(
+        hass, signal_button(host, port, device, button), _handle_button
+    )
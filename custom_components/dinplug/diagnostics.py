@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+
+from homeassistant.const import CONF_HOST, CONF_PORT
+
+from .const import DOMAIN
+from .startup import get_profile
+
+
+def format_trace(trace) -> list:
+    return [
+        f"{datetime.fromtimestamp(ts, timezone.utc).isoformat()} {direction} {line}"
+        for ts, direction, line in trace
+    ]
+
+
+async def async_get_config_entry_diagnostics(hass, entry):
+    """Return connection state and the recent RX/TX trace for a controller."""
+    conn = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "host": entry.data[CONF_HOST],
+        "port": entry.data[CONF_PORT],
+        "connected": conn.connected,
+        "trace_frozen": conn.trace_frozen,
+        "key_cache": conn.cache_stats,
+        "startup_profile": get_profile(hass),
+        "trace": format_trace(conn.get_trace()),
+    }
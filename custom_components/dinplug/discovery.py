@@ -0,0 +1,120 @@
+import logging
+from typing import Any, Callable, Dict, List, Set
+
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import (
+    async_dispatcher_connect,
+    async_dispatcher_send,
+)
+from homeassistant.helpers.event import async_call_later
+
+from .connection import KIND_BUTTON, KIND_HVAC, KIND_LOAD, KIND_SHADE, M4Connection
+from .const import (
+    CONF_BUTTON_ID,
+    CONF_BUTTONS,
+    CONF_CHANNEL,
+    CONF_COVERS,
+    CONF_DEVICE,
+    CONF_HVACS,
+    CONF_LIGHTS,
+    DOMAIN,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+KINDS = (KIND_LOAD, KIND_SHADE, KIND_BUTTON, KIND_HVAC)
+
+# New keys arrive in bursts after REFRESH; collect them before adding entities
+DISCOVERY_BATCH_DELAY = 2.0
+
+
+def signal_new_keys(entry_id: str, kind: str) -> str:
+    """Dispatcher signal carrying a batch of newly discovered keys."""
+    return f"{DOMAIN}_{entry_id}_discovered_{kind}"
+
+
+def async_setup_discovered(
+    hass, entry, kind: str, async_add_entities, factory: Callable[[Any], Any]
+) -> None:
+    """Add an entity built by factory(key) for each discovered key of kind."""
+
+    @callback
+    def _async_add_discovered(keys) -> None:
+        async_add_entities([factory(key) for key in keys])
+
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, signal_new_keys(entry.entry_id, kind), _async_add_discovered
+        )
+    )
+
+
+def configured_keys(data: Dict[str, Any]) -> Dict[str, Set[Any]]:
+    """Keys already covered by explicit entity configuration."""
+    return {
+        KIND_LOAD: {
+            (c[CONF_DEVICE], c[CONF_CHANNEL]) for c in data.get(CONF_LIGHTS, [])
+        },
+        KIND_SHADE: {
+            (c[CONF_DEVICE], c[CONF_CHANNEL]) for c in data.get(CONF_COVERS, [])
+        },
+        KIND_BUTTON: {
+            (c[CONF_DEVICE], c[CONF_BUTTON_ID]) for c in data.get(CONF_BUTTONS, [])
+        },
+        KIND_HVAC: {c[CONF_DEVICE] for c in data.get(CONF_HVACS, [])},
+    }
+
+
+class M4Discovery:
+    """Build an inventory of controller keys and offer unconfigured ones as entities."""
+
+    def __init__(self, hass, entry_id: str, conn: M4Connection):
+        self._hass = hass
+        self._entry_id = entry_id
+        self._conn = conn
+        self._known: Dict[str, Set[Any]] = {kind: set() for kind in KINDS}
+        self._pending: Dict[str, List[Any]] = {kind: [] for kind in KINDS}
+        self._unsub_flush = None
+        self._unsub_keys = None
+
+    def start(self, configured: Dict[str, Set[Any]]) -> None:
+        for kind in KINDS:
+            self._known[kind].update(configured.get(kind, ()))
+        self._unsub_keys = self._conn.register_discovery_listener(self._handle_new_key)
+        # Keys seen before the entry was set up (e.g. after a reload)
+        for kind in KINDS:
+            for key in self._conn.known_keys(kind):
+                self._handle_new_key(kind, key)
+
+    @callback
+    def stop(self) -> None:
+        if self._unsub_keys is not None:
+            self._unsub_keys()
+            self._unsub_keys = None
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+
+    @callback
+    def _handle_new_key(self, kind: str, key: Any) -> None:
+        if key in self._known[kind]:
+            return
+        self._known[kind].add(key)
+        self._pending[kind].append(key)
+        if self._unsub_flush is None:
+            self._unsub_flush = async_call_later(
+                self._hass, DISCOVERY_BATCH_DELAY, self._async_flush
+            )
+
+    @callback
+    def _async_flush(self, _now) -> None:
+        self._unsub_flush = None
+        for kind in KINDS:
+            keys = self._pending[kind]
+            if not keys:
+                continue
+            self._pending[kind] = []
+            _LOGGER.info("Discovered %s new %s key(s)", len(keys), kind)
+            async_dispatcher_send(
+                self._hass, signal_new_keys(self._entry_id, kind), keys
+            )
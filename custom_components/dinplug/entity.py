@@ -0,0 +1,74 @@
+import time
+
+from homeassistant.core import callback
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.event import async_call_later
+
+from .connection import M4Connection
+
+
+class M4Entity(Entity):
+    """Common behaviour for entities backed by an M4Connection."""
+
+    _attr_should_poll = False
+    _conn: M4Connection
+
+    # Minimum seconds between state writes caused by controller reports;
+    # 0 writes every report
+    _min_write_interval: float = 0.0
+    _last_write: float = 0.0
+    _unsub_write = None
+
+    @property
+    def available(self) -> bool:
+        return self._conn.available
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(
+            self._conn.register_availability_listener(self._handle_availability)
+        )
+
+    async def async_will_remove_from_hass(self) -> None:
+        self._cancel_limited_write()
+
+    @callback
+    def _handle_availability(self, connected: bool) -> None:
+        """Called directly by the connection, once per entity, when availability changes."""
+        self.async_write_ha_state()
+
+    # ---- Rate-limited state writes ----
+
+    @callback
+    def _async_write_limited(self, final: bool = False) -> None:
+        """Write state at most once per _min_write_interval.
+
+        The first change after a quiet period is written at once; later ones
+        within the interval collapse into one trailing write of the latest
+        value. final=True writes immediately (e.g. a cover reached its target).
+        """
+        if final or not self._min_write_interval:
+            self._cancel_limited_write()
+            self._write_limited_now()
+            return
+        if self._unsub_write is not None:
+            return
+        delay = self._last_write + self._min_write_interval - time.monotonic()
+        if delay <= 0:
+            self._write_limited_now()
+        else:
+            self._unsub_write = async_call_later(self.hass, delay, self._write_trailing)
+
+    @callback
+    def _write_trailing(self, _now) -> None:
+        self._unsub_write = None
+        self._write_limited_now()
+
+    @callback
+    def _write_limited_now(self) -> None:
+        self._last_write = time.monotonic()
+        self.async_write_ha_state()
+
+    def _cancel_limited_write(self) -> None:
+        if self._unsub_write is not None:
+            self._unsub_write()
+            self._unsub_write = None
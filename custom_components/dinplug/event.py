@@ -0,0 +1,135 @@
+import logging
+from typing import Optional
+
+from homeassistant.components.event import EventDeviceClass, EventEntity
+from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PORT
+from homeassistant.core import callback
+from homeassistant.helpers.device_registry import DeviceInfo
+
+from .connection import KIND_BUTTON, M4Connection
+from .const import (
+    CONF_BUTTONS,
+    CONF_BUTTON_ID,
+    CONF_DEVICE,
+    DOMAIN,
+    keypad_identifier,
+)
+from .discovery import async_setup_discovered
+from .entity import M4Entity
+from .sensor import legacy_button_confs
+from .startup import profiled
+
+_LOGGER = logging.getLogger(__name__)
+
+# Controller R:BTN state -> event type; RELEASE ends a gesture and fires
+# nothing, so each gesture is a single recorded event
+EVENT_TYPES = {
+    "PRESS": "press",
+    "HOLD": "hold",
+    "DOUBLE": "double",
+}
+
+
+@profiled("event")
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Set up one event entity per keypad button of a config entry.
+
+    Buttons that still have their legacy sensor get no event entity until
+    the sensor is deleted (and the entry reloaded).
+    """
+    conn = hass.data[DOMAIN][entry.entry_id]
+    host = entry.data[CONF_HOST]
+    port = entry.data[CONF_PORT]
+    legacy = {
+        (cfg[CONF_DEVICE], cfg[CONF_BUTTON_ID])
+        for cfg in legacy_button_confs(hass, entry)
+    }
+    confs = [
+        cfg
+        for cfg in entry.data.get(CONF_BUTTONS, [])
+        if (cfg[CONF_DEVICE], cfg[CONF_BUTTON_ID]) not in legacy
+    ]
+    async_add_entities(_build_entities(conn, host, port, confs))
+
+    def _discovered(key) -> M4ButtonEvent:
+        dev, btn = key
+        name = f"DINPLUG Button {dev}:{btn}"
+        return M4ButtonEvent(conn, host, port, name, dev, btn, discovered=True)
+
+    async_setup_discovered(hass, entry, KIND_BUTTON, async_add_entities, _discovered)
+
+
+def _build_entities(conn: M4Connection, host: str, port: int, confs) -> list:
+    entities = []
+    for cfg in confs:
+        name = cfg[CONF_NAME]
+        dev = cfg[CONF_DEVICE]
+        button_id = cfg[CONF_BUTTON_ID]
+        entities.append(M4ButtonEvent(conn, host, port, name, dev, button_id))
+    return entities
+
+
+class M4ButtonEvent(M4Entity, EventEntity):
+    """Keypad button as an event entity.
+
+    Every event is a recorded state change, so only one is fired per
+    gesture: RELEASE is ignored and repeated HOLD reports while a key
+    stays down fire a single "hold" event.
+    """
+
+    _attr_device_class = EventDeviceClass.BUTTON
+    _attr_event_types = list(EVENT_TYPES.values())
+
+    def __init__(
+        self,
+        conn: M4Connection,
+        host: str,
+        port: int,
+        name: str,
+        device: int,
+        button: int,
+        discovered: bool = False,
+    ):
+        self._conn = conn
+        self._host = host
+        self._port = port
+        self._attr_name = name
+        self._device = device
+        self._button = button
+        self._attr_entity_registry_enabled_default = not discovered
+        self._attr_unique_id = (
+            f"{self._host}-{self._port}-button-event-{self._device}-{self._button}"
+        )
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, keypad_identifier(host, port, device))},
+            name=f"Keypad {device}",
+            manufacturer="DINPLUG",
+        )
+        self._last: Optional[str] = None
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._conn.register_button_listener(
+                self._device, self._button, self._handle_button_state
+            )
+        )
+
+    @callback
+    def _handle_button_state(self, state: str) -> None:
+        normalized = state.upper()
+        repeat = normalized == "HOLD" and self._last == "HOLD"
+        self._last = normalized
+        if normalized == "RELEASE" or repeat:
+            return
+        event_type = EVENT_TYPES.get(normalized)
+        if event_type is None:
+            _LOGGER.debug(
+                "Ignoring unknown button state for dev=%s button=%s: %s",
+                self._device,
+                self._button,
+                state,
+            )
+            return
+        self._trigger_event(event_type)
+        self.async_write_ha_state()
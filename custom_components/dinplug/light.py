@@ -4,18 +4,38 @@ from typing import Optional
 import voluptuous as vol
 
 from homeassistant.components.light import (
+    ATTR_BRIGHTNESS,
+    ATTR_TRANSITION,
     PLATFORM_SCHEMA,
     ColorMode,
     LightEntity,
+    LightEntityFeature,
 )
 from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PORT
+from homeassistant.core import callback
 import homeassistant.helpers.config_validation as cv
 
-from .connection import DEFAULT_PORT, M4Connection, get_connection
-from .const import CONF_CHANNEL, CONF_DEVICE, CONF_DIMMER, CONF_LIGHTS, DOMAIN
+from .connection import DEFAULT_PORT, KIND_LOAD, M4Connection, get_connection
+from .const import (
+    CONF_CHANNEL,
+    CONF_DEFAULT_TRANSITION,
+    CONF_DEVICE,
+    CONF_DIMMER,
+    CONF_LIGHTS,
+    CONF_MIN_WRITE_INTERVAL,
+    CONF_POWER_GROUPS,
+    CONF_WATTS,
+    DOMAIN,
+)
+from .discovery import async_setup_discovered
+from .entity import M4Entity
+from .startup import bulk_list, profiled
 
 _LOGGER = logging.getLogger(__name__)
 
+# Controller fade field is four digits of seconds
+MAX_FADE = 9999
+
 # ---------- YAML schema ----------
 
 LIGHT_SCHEMA = vol.Schema(
@@ -24,14 +44,30 @@ LIGHT_SCHEMA = vol.Schema(
         vol.Required(CONF_DEVICE): vol.Coerce(int),
         vol.Required(CONF_CHANNEL): vol.Coerce(int),
         vol.Optional(CONF_DIMMER, default=True): cv.boolean,
+        vol.Optional(CONF_DEFAULT_TRANSITION): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=MAX_FADE)
+        ),
+        vol.Optional(CONF_MIN_WRITE_INTERVAL, default=0): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
+        vol.Optional(CONF_WATTS): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_POWER_GROUPS, default=[]): vol.All(
+            cv.ensure_list, [cv.string]
+        ),
     }
 )
 
+LIGHTS_SCHEMA = bulk_list(
+    "lights",
+    LIGHT_SCHEMA,
+    {CONF_NAME: str, CONF_DEVICE: int, CONF_CHANNEL: int, CONF_DIMMER: bool},
+)
+
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     {
         vol.Required(CONF_HOST): cv.string,
         vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
-        vol.Required(CONF_LIGHTS): vol.All(cv.ensure_list, [LIGHT_SCHEMA]),
+        vol.Required(CONF_LIGHTS): LIGHTS_SCHEMA,
     }
 )
 
@@ -39,31 +75,66 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
 # ---------- Platform setup ----------
 
 
+@profiled("light")
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     """Set up dinplug lights from YAML."""
     host = config[CONF_HOST]
     port = config[CONF_PORT]
-    lights_conf = config[CONF_LIGHTS]
-
+    # Power sensors are only built for lights under dinplug: controllers:
+    ignored = [
+        cfg[CONF_NAME]
+        for cfg in config[CONF_LIGHTS]
+        if CONF_WATTS in cfg or cfg.get(CONF_POWER_GROUPS)
+    ]
+    if ignored:
+        _LOGGER.warning(
+            "Ignoring watts/power_groups on %s: they only apply to lights "
+            "configured under dinplug: controllers:",
+            ", ".join(ignored),
+        )
     conn = get_connection(hass, host, port)
+    async_add_entities(_build_entities(conn, host, port, config[CONF_LIGHTS]))
 
+
+@profiled("light")
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Set up dinplug lights from a config entry."""
+    conn = hass.data[DOMAIN][entry.entry_id]
+    host = entry.data[CONF_HOST]
+    port = entry.data[CONF_PORT]
+    async_add_entities(
+        _build_entities(conn, host, port, entry.data.get(CONF_LIGHTS, []))
+    )
+
+    def _discovered(key) -> M4Light:
+        dev, ch = key
+        name = f"DINPLUG Load {dev}:{ch}"
+        return M4Light(conn, host, port, name, dev, ch, True, discovered=True)
+
+    async_setup_discovered(hass, entry, KIND_LOAD, async_add_entities, _discovered)
+
+
+def _build_entities(conn: M4Connection, host: str, port: int, confs) -> list:
     entities = []
-    for cfg in lights_conf:
+    for cfg in confs:
         name = cfg[CONF_NAME]
         dev = cfg[CONF_DEVICE]
         ch = cfg[CONF_CHANNEL]
         dimmer = cfg[CONF_DIMMER]
-        entities.append(M4Light(conn, host, port, name, dev, ch, dimmer))
-
-    async_add_entities(entities, update_before_add=True)
+        transition = cfg.get(CONF_DEFAULT_TRANSITION)
+        min_write_interval = cfg.get(CONF_MIN_WRITE_INTERVAL, 0)
+        entities.append(
+            M4Light(
+                conn, host, port, name, dev, ch, dimmer, transition, min_write_interval
+            )
+        )
+    return entities
 
 
 # ---------- Light entity ----------
 
 
-class M4Light(LightEntity):
-    _attr_should_poll = False
-
+class M4Light(M4Entity, LightEntity):
     def __init__(
         self,
         conn: M4Connection,
@@ -73,6 +144,9 @@ class M4Light(LightEntity):
         device: int,
         channel: int,
         dimmer: bool,
+        default_transition: Optional[float] = None,
+        min_write_interval: float = 0.0,
+        discovered: bool = False,
     ):
         self._conn = conn
         self._host = host
@@ -81,6 +155,9 @@ class M4Light(LightEntity):
         self._device = device
         self._channel = channel
         self._dimmer = dimmer
+        self._default_transition = default_transition
+        self._min_write_interval = min_write_interval
+        self._attr_entity_registry_enabled_default = not discovered
 
         self._is_on: bool = False
         self._level: int = 0
@@ -88,16 +165,21 @@ class M4Light(LightEntity):
         if dimmer:
             self._attr_supported_color_modes = {ColorMode.BRIGHTNESS}
             self._attr_color_mode = ColorMode.BRIGHTNESS
+            self._attr_supported_features = LightEntityFeature.TRANSITION
         else:
             self._attr_supported_color_modes = {ColorMode.ONOFF}
             self._attr_color_mode = ColorMode.ONOFF
 
         self._attr_unique_id = f"{self._host}-{self._port}-{self._device}-{self._channel}"
 
-        self._conn.register_load_listener(
-            self._device,
-            self._channel,
-            self._handle_level_update,
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._conn.register_load_listener(
+                self._device,
+                self._channel,
+                self._handle_level_update,
+            )
         )
 
         last = self._conn.get_last_level(self._device, self._channel)
@@ -118,6 +200,7 @@ class M4Light(LightEntity):
 
     # ---- Callbacks from connection ----
 
+    @callback
     def _handle_level_update(self, level: int):
         """Callback from M4Connection when R:LOAD is received."""
         if level < 0 or level > 100:
@@ -139,23 +222,33 @@ class M4Light(LightEntity):
             self._channel,
             level,
         )
-        self.schedule_update_ha_state()
+        # Fades report intermediate levels; the trailing write keeps the end state
+        self._async_write_limited()
 
     # ---- Commands from HA ----
 
+    def _fade(self, kwargs) -> Optional[int]:
+        """Map the HA transition (seconds) to the controller fade field."""
+        transition = kwargs.get(ATTR_TRANSITION, self._default_transition)
+        if transition is None:
+            return None
+        return max(0, min(MAX_FADE, int(round(float(transition)))))
+
     async def async_turn_on(self, **kwargs):
         if self._dimmer:
-            if "brightness" in kwargs:
-                b = int(kwargs["brightness"])
+            if ATTR_BRIGHTNESS in kwargs:
+                b = int(kwargs[ATTR_BRIGHTNESS])
                 level = max(1, min(100, int(b * 100 / 255)))
             else:
                 level = 100
-            self._conn.send_load(self._device, self._channel, level)
+            self._conn.send_load(
+                self._device, self._channel, level, self._fade(kwargs)
+            )
         else:
             self._conn.send_switch(self._device, self._channel, True)
 
     async def async_turn_off(self, **kwargs):
         if self._dimmer:
-            self._conn.send_load(self._device, self._channel, 0)
+            self._conn.send_load(self._device, self._channel, 0, self._fade(kwargs))
         else:
             self._conn.send_switch(self._device, self._channel, False)
@@ -0,0 +1,105 @@
+"""Running power and energy totals for loads with a configured wattage.
+
+Each R:LOAD change adjusts the totals it belongs to by the load's power
+delta, so updates cost O(groups of that load) regardless of how many
+loads the controller has.
+"""
+
+import logging
+import time
+from functools import partial
+from typing import Callable, Dict, List, Tuple
+
+from homeassistant.const import CONF_NAME
+from homeassistant.core import callback
+
+from .connection import M4Connection
+from .const import CONF_CHANNEL, CONF_DEVICE, CONF_POWER_GROUPS, CONF_WATTS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PowerTotal:
+    """Power (W) and integrated energy (Wh) of a set of loads."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.power = 0.0
+        self._energy_wh = 0.0
+        self._stamp = time.monotonic()
+        self._listeners: List[Callable[[], None]] = []
+
+    @property
+    def energy_wh(self) -> float:
+        self._integrate()
+        return self._energy_wh
+
+    def restore_energy(self, energy_wh: float) -> None:
+        self._energy_wh += energy_wh
+
+    def add_listener(self, callback: Callable[[], None]) -> Callable[[], None]:
+        self._listeners.append(callback)
+        return lambda: self._listeners.remove(callback)
+
+    def adjust(self, delta: float) -> None:
+        self._integrate()
+        self.power = max(0.0, self.power + delta)
+        for cb in self._listeners:
+            cb()
+
+    def _integrate(self) -> None:
+        now = time.monotonic()
+        self._energy_wh += self.power * (now - self._stamp) / 3600
+        self._stamp = now
+
+
+class PowerAggregator:
+    """Maintain one controller-wide total and one total per power group."""
+
+    def __init__(self, conn: M4Connection, name: str, lights):
+        self._conn = conn
+        self.total = PowerTotal(name)
+        self.groups: Dict[str, PowerTotal] = {}
+        self._loads: Dict[Tuple[int, int], Tuple[float, Tuple[PowerTotal, ...]]] = {}
+        self._contribution: Dict[Tuple[int, int], float] = {}
+        for cfg in lights:
+            watts = cfg.get(CONF_WATTS)
+            if not watts:
+                continue
+            totals = [self.total]
+            for group in cfg.get(CONF_POWER_GROUPS, []):
+                if group not in self.groups:
+                    self.groups[group] = PowerTotal(group)
+                totals.append(self.groups[group])
+            key = (cfg[CONF_DEVICE], cfg[CONF_CHANNEL])
+            self._loads[key] = (watts, tuple(totals))
+            _LOGGER.debug("Load %s (%s) counts %s W", key, cfg[CONF_NAME], watts)
+
+    def __bool__(self) -> bool:
+        return bool(self._loads)
+
+    def start(self) -> Callable[[], None]:
+        """Listen to every metered load; returns a callable that stops listening."""
+        unsubs = []
+        for dev, ch in self._loads:
+            handler = callback(partial(self._handle_level, (dev, ch)))
+            unsubs.append(self._conn.register_load_listener(dev, ch, handler))
+            level = self._conn.get_last_level(dev, ch)
+            if level is not None:
+                self._handle_level((dev, ch), level)
+
+        def _stop() -> None:
+            for unsub in unsubs:
+                unsub()
+
+        return _stop
+
+    def _handle_level(self, key: Tuple[int, int], level: int) -> None:
+        watts, totals = self._loads[key]
+        power = watts * level / 100
+        delta = power - self._contribution.get(key, 0.0)
+        if not delta:
+            return
+        self._contribution[key] = power
+        for total in totals:
+            total.adjust(delta)
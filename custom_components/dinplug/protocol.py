@@ -0,0 +1,328 @@
+"""Sans-IO DINPLUG/M4 telnet protocol.
+
+Bytes go in, typed events come out; typed commands are encoded to bytes.
+Nothing here performs I/O or imports Home Assistant, so it can be reused
+by command-line tools, benchmarked and fuzzed on its own.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+_LOGGER = logging.getLogger(__name__)
+
+ENCODING = "utf-8"
+
+HVAC_MODES = {"HEAT", "COOL", "OFF"}
+HVAC_FAN_MODES = {"FANHIGH", "FANMID", "FANLOW", "FANAUTO"}
+
+# Temperature kinds carried by HvacTemperatureEvent
+TEMP_TARGET = "target"
+TEMP_CURRENT = "current"
+TEMP_EXTERNAL = "external"
+
+_TEMP_KEYWORDS = {
+    "SETPOINT": TEMP_TARGET,
+    "COOLPOINT": TEMP_TARGET,
+    "HEATPOINT": TEMP_TARGET,
+    "CURRENTTEMP": TEMP_CURRENT,
+    "EXTERNALTEMP": TEMP_EXTERNAL,
+}
+_MODE_KEYWORDS = {"COOL", "HEAT", "FAN", "OFF"}
+
+# Safety limit for a line without a terminator
+MAX_LINE_LENGTH = 4096
+
+
+# ---------- Events (controller -> client) ----------
+
+
+@dataclass(frozen=True)
+class LoadEvent:
+    """R:LOAD dev ch level"""
+
+    device: int
+    channel: int
+    level: int
+
+
+@dataclass(frozen=True)
+class ShadeEvent:
+    """R:SHADE dev ch level"""
+
+    device: int
+    channel: int
+    level: int
+
+
+@dataclass(frozen=True)
+class ButtonEvent:
+    """R:BTN STATE dev button"""
+
+    device: int
+    button: int
+    state: str
+
+
+@dataclass(frozen=True)
+class HvacTemperatureEvent:
+    """R:HVAC SETPOINT|COOLPOINT|HEATPOINT|CURRENTTEMP|EXTERNALTEMP dev value"""
+
+    device: int
+    kind: str
+    value: float
+
+
+@dataclass(frozen=True)
+class HvacModeEvent:
+    """R:HVAC COOL|HEAT|FAN|OFF dev"""
+
+    device: int
+    mode: str
+
+
+@dataclass(frozen=True)
+class HvacFanEvent:
+    """R:HVAC FANHIGH|FANMID|FANLOW|FANAUTO dev"""
+
+    device: int
+    fan_mode: str
+
+
+Event = Union[
+    LoadEvent, ShadeEvent, ButtonEvent, HvacTemperatureEvent, HvacModeEvent, HvacFanEvent
+]
+
+
+# ---------- Commands (client -> controller) ----------
+
+
+@dataclass(frozen=True)
+class LoadCommand:
+    device: int
+    channel: int
+    level: int
+    fade: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class ShadeCommand:
+    """action is UP, DOWN, STOP or SET (SET requires level)."""
+
+    action: str
+    device: int
+    channel: int
+    level: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class HvacSetpointCommand:
+    device: int
+    temperature: float
+
+
+@dataclass(frozen=True)
+class HvacModeCommand:
+    device: int
+    mode: str
+
+
+@dataclass(frozen=True)
+class HvacFanCommand:
+    device: int
+    fan_mode: str
+
+
+@dataclass(frozen=True)
+class RawCommand:
+    text: str
+
+
+Command = Union[
+    LoadCommand,
+    ShadeCommand,
+    HvacSetpointCommand,
+    HvacModeCommand,
+    HvacFanCommand,
+    RawCommand,
+]
+
+
+# ---------- Decoding ----------
+
+
+class LineDecoder:
+    """Split a byte stream into stripped text lines, buffering partial ones."""
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, data: bytes) -> List[str]:
+        self._buffer += data
+        *complete, self._buffer = self._buffer.split(b"\n")
+        if len(self._buffer) > MAX_LINE_LENGTH:
+            _LOGGER.debug("Discarding over-long partial line (%s bytes)", len(self._buffer))
+            self._buffer = b""
+        lines = []
+        for raw in complete:
+            text = raw.decode(ENCODING, errors="ignore").strip()
+            if text:
+                lines.append(text)
+        return lines
+
+    def reset(self) -> None:
+        self._buffer = b""
+
+
+def parse_line(text: str) -> Optional[Event]:
+    """Parse one controller line; None if it is not a recognised report."""
+    if text.startswith("R:LOAD "):
+        return _parse_level(text, LoadEvent)
+    if text.startswith("R:SHADE "):
+        return _parse_level(text, ShadeEvent)
+    if text.startswith("R:BTN "):
+        return _parse_button(text)
+    if text.startswith("R:HVAC"):
+        return _parse_hvac(text)
+    return None
+
+
+def _parse_level(text: str, event_type):
+    parts = text.split()
+    if len(parts) < 4:
+        return None
+    try:
+        dev = int(parts[1])
+        ch = int(parts[2])
+        level = int(parts[3])
+    except ValueError:
+        return None
+
+    if level < 0 or level > 100:
+        _LOGGER.debug("Ignoring out-of-range level in %r", text)
+        return None
+    return event_type(dev, ch, level)
+
+
+def _parse_button(text: str) -> Optional[ButtonEvent]:
+    # Example: R:BTN PRESS 111 2
+    parts = text.split()
+    if len(parts) < 4:
+        return None
+    try:
+        dev = int(parts[2])
+        btn = int(parts[3])
+    except ValueError:
+        return None
+    return ButtonEvent(dev, btn, parts[1].upper())
+
+
+def _parse_hvac(text: str) -> Optional[Event]:
+    parts = text.split()
+    if len(parts) < 3:
+        return None
+    keyword = parts[1].upper()
+    try:
+        dev = int(parts[2])
+    except ValueError:
+        return None
+
+    kind = _TEMP_KEYWORDS.get(keyword)
+    if kind is not None:
+        if len(parts) < 4:
+            return None
+        try:
+            value = float(parts[3])
+        except ValueError:
+            return None
+        return HvacTemperatureEvent(dev, kind, value)
+
+    if keyword in _MODE_KEYWORDS:
+        return HvacModeEvent(dev, keyword)
+    if keyword in HVAC_FAN_MODES:
+        return HvacFanEvent(dev, keyword)
+    return None
+
+
+class Protocol:
+    """Stateful decoder: feed received bytes, get typed events back."""
+
+    def __init__(self):
+        self._decoder = LineDecoder()
+
+    def receive(self, data: bytes) -> List[Event]:
+        events = []
+        for text in self._decoder.feed(data):
+            event = parse_line(text)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def reset(self) -> None:
+        self._decoder.reset()
+
+
+# ---------- Encoding ----------
+
+
+def command_text(command: Command) -> str:
+    """Render a command as the controller's text syntax (without CRLF)."""
+    if isinstance(command, LoadCommand):
+        level = max(0, min(100, int(command.level)))
+        if command.fade is None:
+            return f"LOAD {command.device} {command.channel} {level}"
+        return f"LOAD {command.device} {command.channel} {level:03d} {command.fade:04d}"
+
+    if isinstance(command, ShadeCommand):
+        action = command.action.upper()
+        if action == "SET":
+            level = max(0, min(100, int(command.level)))
+            return f"SHADE SET {command.device} {command.channel} {level}"
+        if action not in {"UP", "DOWN", "STOP"}:
+            raise ValueError(f"Unsupported shade action {command.action}")
+        return f"SHADE {action} {command.device} {command.channel}"
+
+    if isinstance(command, HvacSetpointCommand):
+        value = max(0, min(99, int(round(command.temperature))))
+        return f"HVAC SETPOINT {command.device} {value:02d}"
+
+    if isinstance(command, HvacModeCommand):
+        mode = command.mode.upper()
+        if mode not in HVAC_MODES:
+            raise ValueError(f"Unsupported HVAC mode {mode}")
+        return f"HVAC {mode} {command.device}"
+
+    if isinstance(command, HvacFanCommand):
+        mode = command.fan_mode.upper()
+        if mode not in HVAC_FAN_MODES:
+            raise ValueError(f"Unsupported fan mode {command.fan_mode}")
+        return f"HVAC {mode} {command.device}"
+
+    if isinstance(command, RawCommand):
+        return command.text
+
+    raise TypeError(f"Unknown command {command!r}")
+
+
+def encode_text(text: str) -> bytes:
+    return (text + "\r\n").encode(ENCODING)
+
+
+def encode(command: Command) -> bytes:
+    return encode_text(command_text(command))
+
+
+def command_target(text: str) -> Tuple:
+    """Key identifying what a command acts on; later commands replace earlier ones."""
+    parts = text.split()
+    if len(parts) >= 3 and parts[0] == "LOAD":
+        return ("LOAD", parts[1], parts[2])
+    if len(parts) >= 4 and parts[0] == "SHADE":
+        return ("SHADE", parts[2], parts[3])
+    if len(parts) >= 3 and parts[0] == "HVAC":
+        if parts[1] == "SETPOINT":
+            return ("HVAC SETPOINT", parts[2])
+        if parts[1].startswith("FAN"):
+            return ("HVAC FAN", parts[2])
+        return ("HVAC MODE", parts[2])
+    return (text,)
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from typing import Set
+
+from .connection import M4Connection
+from .protocol import LineDecoder, encode_text
+
+_LOGGER = logging.getLogger(__name__)
+
+# Downstream clients that fall this far behind are disconnected
+MAX_CLIENT_BACKLOG = 256 * 1024
+
+# Handled locally instead of being forwarded upstream
+_LOCAL_COMMANDS = {"REFRESH", "STA"}
+
+
+class M4Proxy:
+    """Share one upstream controller session with any number of local clients.
+
+    Every line received from the controller is relayed to all clients.
+    Client commands go through the connection's send path (and its outbox
+    while disconnected). REFRESH is answered from the connection cache and
+    STA is absorbed, so upstream load does not grow with the client count.
+    """
+
+    def __init__(self, conn: M4Connection, host: str, port: int):
+        self._conn = conn
+        self._host = host
+        self._port = port
+        self._server = None
+        self._clients: Set[asyncio.StreamWriter] = set()
+        self._unsub_lines = None
+
+    async def async_start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._handle_client, self._host, self._port
+        )
+        self._unsub_lines = self._conn.register_line_listener(self._relay)
+        _LOGGER.info("DINPLUG proxy listening on %s:%s", self._host, self._port)
+
+    async def async_stop(self) -> None:
+        if self._unsub_lines is not None:
+            self._unsub_lines()
+            self._unsub_lines = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for writer in list(self._clients):
+            writer.close()
+        self._clients.clear()
+
+    def _relay(self, text: str) -> None:
+        if not self._clients:
+            return
+        data = encode_text(text)
+        for writer in list(self._clients):
+            if writer.transport.get_write_buffer_size() > MAX_CLIENT_BACKLOG:
+                _LOGGER.warning("Dropping slow DINPLUG proxy client %s", _peer(writer))
+                self._clients.discard(writer)
+                writer.close()
+                continue
+            writer.write(data)
+
+    async def _handle_client(self, reader, writer) -> None:
+        _LOGGER.debug("DINPLUG proxy client connected: %s", _peer(writer))
+        self._clients.add(writer)
+        decoder = LineDecoder()
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                for text in decoder.feed(data):
+                    self._handle_command(text, writer)
+        except (ConnectionError, OSError) as err:
+            _LOGGER.debug("DINPLUG proxy client error: %s", err)
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+            _LOGGER.debug("DINPLUG proxy client disconnected: %s", _peer(writer))
+
+    def _handle_command(self, text: str, writer) -> None:
+        keyword = text.split(maxsplit=1)[0].upper()
+        if keyword == "REFRESH":
+            writer.write(
+                b"".join(encode_text(line) for line in self._conn.cached_report_lines())
+            )
+        elif keyword not in _LOCAL_COMMANDS:
+            self._conn.send_raw(text)
+
+
+def _peer(writer) -> str:
+    peer = writer.get_extra_info("peername")
+    return f"{peer[0]}:{peer[1]}" if peer else "?"
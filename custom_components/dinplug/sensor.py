@@ -1,14 +1,44 @@
+from datetime import timedelta
 import logging
 from typing import Optional
 
 import voluptuous as vol
 
-from homeassistant.components.sensor import PLATFORM_SCHEMA, SensorDeviceClass, SensorEntity
-from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PORT
+from homeassistant.components.sensor import (
+    PLATFORM_SCHEMA,
+    RestoreSensor,
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.const import (
+    CONF_HOST,
+    CONF_NAME,
+    CONF_PORT,
+    UnitOfEnergy,
+    UnitOfPower,
+)
+from homeassistant.core import callback
 import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import entity_registry as er, issue_registry as ir
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.start import async_at_started
+from homeassistant.util import slugify
 
 from .connection import DEFAULT_PORT, M4Connection, get_connection
-from .const import CONF_BUTTONS, CONF_BUTTON_ID, CONF_DEVICE
+from .const import (
+    CONF_BUTTONS,
+    CONF_BUTTON_ID,
+    CONF_BUTTON_SENSORS,
+    CONF_DEVICE,
+    CONF_LIGHTS,
+    DOMAIN,
+    keypad_identifier,
+)
+from .entity import M4Entity
+from .startup import bulk_list, profiled
+from .power import PowerAggregator, PowerTotal
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -20,38 +50,126 @@ BUTTON_SCHEMA = vol.Schema(
     }
 )
 
+BUTTONS_SCHEMA = bulk_list(
+    "buttons", BUTTON_SCHEMA, {CONF_NAME: str, CONF_DEVICE: int, CONF_BUTTON_ID: int}
+)
+
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     {
         vol.Required(CONF_HOST): cv.string,
         vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
-        vol.Required(CONF_BUTTONS): vol.All(cv.ensure_list, [BUTTON_SCHEMA]),
+        vol.Required(CONF_BUTTONS): BUTTONS_SCHEMA,
     }
 )
 
 BUTTON_STATES = ["PRESSED", "RELEASED", "HELD", "DOUBLE"]
 BUTTON_MAP = {"PRESS": "PRESSED", "RELEASE": "RELEASED", "HOLD": "HELD"}
 
+# Power totals change on every R:LOAD; write them at most this often
+POWER_UPDATE_INTERVAL = 5.0
+# Energy keeps growing at constant power; refresh it at least this often
+ENERGY_UPDATE_INTERVAL = timedelta(minutes=1)
+
 
+@profiled("sensor")
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     """Expose keypad/button states as sensors."""
     host = config[CONF_HOST]
     port = config[CONF_PORT]
-    buttons_conf = config[CONF_BUTTONS]
-
     conn = get_connection(hass, host, port)
+    async_add_entities(_build_entities(conn, host, port, config[CONF_BUTTONS]))
+
+
+@profiled("sensor")
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Set up legacy keypad/button sensors from a config entry.
+
+    Buttons are exposed as event entities (event.py). Sensors are only
+    created when the controller sets button_sensors, or for buttons whose
+    sensor is already in the entity registry, so existing automations keep
+    working until the user removes them; see legacy_button_confs.
+    """
+    conn = hass.data[DOMAIN][entry.entry_id]
+    host = entry.data[CONF_HOST]
+    port = entry.data[CONF_PORT]
+    opted_in = entry.data.get(CONF_BUTTON_SENSORS, False)
+    confs = legacy_button_confs(hass, entry)
+
+    issue_id = f"button_sensors_{entry.entry_id}"
+    if confs and not opted_in:
+        ir.async_create_issue(
+            hass,
+            DOMAIN,
+            issue_id,
+            is_fixable=False,
+            severity=ir.IssueSeverity.WARNING,
+            translation_key="button_sensors_deprecated",
+            translation_placeholders={"host": host, "count": str(len(confs))},
+        )
+    else:
+        ir.async_delete_issue(hass, DOMAIN, issue_id)
+
+    entities = _build_entities(conn, host, port, confs)
+
+    aggregator = PowerAggregator(conn, host, entry.data.get(CONF_LIGHTS, []))
+    if aggregator:
+
+        @callback
+        def _start_power(_hass) -> None:
+            # Totals are seeded from the level cache, so they can start late
+            entry.async_on_unload(aggregator.start())
+
+        entry.async_on_unload(async_at_started(hass, _start_power))
+        prefix = f"{host}-{port}"
+        totals = [(f"{prefix}-power", f"DINPLUG {host}", aggregator.total)]
+        for group, total in aggregator.groups.items():
+            totals.append((f"{prefix}-power-{slugify(group)}", group, total))
+        for unique_id, name, total in totals:
+            entities.append(M4PowerSensor(conn, total, unique_id, f"{name} Power"))
+            entities.append(
+                M4EnergySensor(conn, total, f"{unique_id}-energy", f"{name} Energy")
+            )
+
+    async_add_entities(entities)
+
+
+def legacy_button_confs(hass, entry) -> list:
+    """Buttons of a config entry that keep their legacy sensor.
+
+    These get no event entity (event.py), so a press is not recorded twice.
+    """
+    confs = entry.data.get(CONF_BUTTONS, [])
+    if entry.data.get(CONF_BUTTON_SENSORS, False):
+        return confs
+    host = entry.data[CONF_HOST]
+    port = entry.data[CONF_PORT]
+    registry = er.async_get(hass)
+    return [
+        cfg
+        for cfg in confs
+        if registry.async_get_entity_id(
+            "sensor",
+            DOMAIN,
+            _unique_id(host, port, cfg[CONF_DEVICE], cfg[CONF_BUTTON_ID]),
+        )
+    ]
+
 
+def _unique_id(host: str, port: int, device: int, button: int) -> str:
+    return f"{host}-{port}-button-{device}-{button}"
+
+
+def _build_entities(conn: M4Connection, host: str, port: int, confs) -> list:
     entities = []
-    for cfg in buttons_conf:
+    for cfg in confs:
         name = cfg[CONF_NAME]
         dev = cfg[CONF_DEVICE]
         button_id = cfg[CONF_BUTTON_ID]
         entities.append(M4ButtonSensor(conn, host, port, name, dev, button_id))
-
-    async_add_entities(entities, update_before_add=True)
+    return entities
 
 
-class M4ButtonSensor(SensorEntity):
-    _attr_should_poll = False
+class M4ButtonSensor(M4Entity, SensorEntity):
     _attr_device_class = SensorDeviceClass.ENUM
     _attr_options = BUTTON_STATES
 
@@ -70,13 +188,20 @@ class M4ButtonSensor(SensorEntity):
         self._attr_name = name
         self._device = device
         self._button = button
-        self._attr_unique_id = (
-            f"{self._host}-{self._port}-button-{self._device}-{self._button}"
+        self._attr_unique_id = _unique_id(host, port, device, button)
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, keypad_identifier(host, port, device))},
+            name=f"Keypad {device}",
+            manufacturer="DINPLUG",
         )
         self._state: Optional[str] = None
 
-        self._conn.register_button_listener(
-            self._device, self._button, self._handle_button_state
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._conn.register_button_listener(
+                self._device, self._button, self._handle_button_state
+            )
         )
 
         last = self._conn.get_last_button_state(self._device, self._button)
@@ -87,6 +212,7 @@ class M4ButtonSensor(SensorEntity):
     def native_value(self) -> Optional[str]:
         return self._state
 
+    @callback
     def _handle_button_state(self, state: str) -> None:
         normalized = state.upper()
         display = BUTTON_MAP.get(normalized, normalized)
@@ -100,4 +226,59 @@ class M4ButtonSensor(SensorEntity):
             return
 
         self._state = display
-        self.schedule_update_ha_state()
+        self.async_write_ha_state()
+
+
+class M4PowerSensor(M4Entity, SensorEntity):
+    """Summed power of metered loads, written at most every POWER_UPDATE_INTERVAL."""
+
+    _attr_device_class = SensorDeviceClass.POWER
+    _attr_native_unit_of_measurement = UnitOfPower.WATT
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _min_write_interval = POWER_UPDATE_INTERVAL
+
+    def __init__(self, conn: M4Connection, total: PowerTotal, unique_id: str, name: str):
+        self._conn = conn
+        self._total = total
+        self._attr_unique_id = unique_id
+        self._attr_name = name
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(self._total.add_listener(self._handle_total))
+
+    @property
+    def native_value(self) -> float:
+        return round(self._total.power, 1)
+
+    @callback
+    def _handle_total(self) -> None:
+        self._async_write_limited()
+
+
+class M4EnergySensor(M4PowerSensor, RestoreSensor):
+    """Energy integrated from the same total; survives restarts."""
+
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        last = await self.async_get_last_sensor_data()
+        if last is not None and last.native_value is not None:
+            self._total.restore_energy(float(last.native_value) * 1000)
+        self.async_on_remove(
+            async_track_time_interval(
+                self.hass, self._handle_interval, ENERGY_UPDATE_INTERVAL
+            )
+        )
+
+    @property
+    def native_value(self) -> float:
+        return round(self._total.energy_wh / 1000, 3)
+
+    @callback
+    def _handle_interval(self, _now) -> None:
+        if self._total.power:
+            self._handle_total()
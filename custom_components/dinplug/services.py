@@ -0,0 +1,103 @@
+import logging
+import os
+import time
+
+import voluptuous as vol
+
+from homeassistant.const import CONF_HOST
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+
+from .connection import iter_connections
+from .const import DOMAIN
+from .diagnostics import format_trace
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_FREEZE_TRACE = "freeze_trace"
+SERVICE_DUMP_TRACE = "dump_trace"
+SERVICE_SNAPSHOT = "snapshot"
+SERVICE_RESTORE = "restore"
+
+ATTR_FROZEN = "frozen"
+ATTR_SNAPSHOT = "name"
+ATTR_DEVICES = "devices"
+ATTR_TRANSITION = "transition"
+
+FREEZE_TRACE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_HOST): cv.string,
+        vol.Optional(ATTR_FROZEN, default=True): cv.boolean,
+    }
+)
+DUMP_TRACE_SCHEMA = vol.Schema({vol.Optional(CONF_HOST): cv.string})
+SNAPSHOT_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_SNAPSHOT): cv.string,
+        vol.Optional(CONF_HOST): cv.string,
+        vol.Optional(ATTR_DEVICES): vol.All(cv.ensure_list, [vol.Coerce(int)]),
+    }
+)
+RESTORE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_SNAPSHOT): cv.string,
+        vol.Optional(CONF_HOST): cv.string,
+        vol.Optional(ATTR_TRANSITION): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    }
+)
+
+
+def _connections(hass, call):
+    host = call.data.get(CONF_HOST)
+    return [conn for conn in iter_connections(hass) if host in (None, conn.host)]
+
+
+def async_setup_services(hass) -> None:
+    """Register integration-wide services."""
+
+    async def _async_freeze_trace(call):
+        for conn in _connections(hass, call):
+            conn.freeze_trace(call.data[ATTR_FROZEN])
+
+    async def _async_dump_trace(call):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        for conn in _connections(hass, call):
+            path = hass.config.path(f"dinplug_trace_{conn.host}_{conn.port}_{stamp}.log")
+            lines = format_trace(conn.get_trace())
+            await hass.async_add_executor_job(_write_lines, path, lines)
+            _LOGGER.info("DINPLUG trace (%s lines) written to %s", len(lines), path)
+
+    async def _async_snapshot(call):
+        name = call.data[ATTR_SNAPSHOT]
+        for conn in _connections(hass, call):
+            count = conn.snapshot(name, call.data.get(ATTR_DEVICES))
+            _LOGGER.debug("Snapshot %s of %s: %s entries", name, conn.host, count)
+
+    async def _async_restore(call):
+        name = call.data[ATTR_SNAPSHOT]
+        fade = None
+        if ATTR_TRANSITION in call.data:
+            fade = int(round(call.data[ATTR_TRANSITION]))
+        for conn in _connections(hass, call):
+            if name not in conn.snapshot_names():
+                raise HomeAssistantError(f"No dinplug snapshot named {name} for {conn.host}")
+            sent = conn.restore(name, fade)
+            _LOGGER.debug("Restored %s on %s: %s commands", name, conn.host, sent)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_SNAPSHOT, _async_snapshot, schema=SNAPSHOT_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_RESTORE, _async_restore, schema=RESTORE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_FREEZE_TRACE, _async_freeze_trace, schema=FREEZE_TRACE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_DUMP_TRACE, _async_dump_trace, schema=DUMP_TRACE_SCHEMA
+    )
+
+
+def _write_lines(path: str, lines) -> None:
+    with open(path, "w", encoding="utf-8") as trace_file:
+        trace_file.write(os.linesep.join(lines) + os.linesep)
@@ -0,0 +1,143 @@
+"""Startup profiling and fast paths for large installations.
+
+* bulk_list: list validator that only fills defaults into plain, already
+  typed YAML rows and runs the full schema for everything else.
+* profiled: records time spent (and entities added) in platform setup.
+* The collected profile is logged once Home Assistant has started and is
+  included in the config entry diagnostics.
+"""
+
+from functools import wraps
+import logging
+import time
+from typing import Any, Callable, Dict
+
+import voluptuous as vol
+
+from homeassistant.core import callback
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.start import async_at_started
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+PROFILE_KEY = f"{DOMAIN}_startup_profile"
+
+# Validation runs before hass is available to the integration; keep its
+# timings at module level and merge them into the profile report
+_validation_profile: Dict[str, Dict[str, float]] = {}
+
+
+def _record(profile: Dict[str, Dict[str, float]], name: str, seconds: float, count: int) -> None:
+    entry = profile.setdefault(name, {"calls": 0, "seconds": 0.0, "items": 0})
+    entry["calls"] += 1
+    entry["seconds"] += seconds
+    entry["items"] += count
+
+
+def _has_type(value: Any, expected: type) -> bool:
+    # bool is an int subclass; a YAML true must not pass as a device number
+    return isinstance(value, expected) and not (
+        expected is int and isinstance(value, bool)
+    )
+
+
+def bulk_list(name: str, schema: vol.Schema, types: Dict[str, type]) -> Callable:
+    """Validate a list of items, skipping the full schema for plain rows.
+
+    A row takes the fast path when it has every required key and each of
+    its keys is listed in types with a value of that type; it only gets
+    the schema's defaults filled in. Any other row goes through schema,
+    so errors are reported exactly as before.
+    """
+    required = {str(key) for key in schema.schema if isinstance(key, vol.Required)}
+    defaults = {
+        str(key): key.default
+        for key in schema.schema
+        if isinstance(key, vol.Optional) and key.default is not vol.UNDEFINED
+    }
+
+    def validate(value):
+        started = time.perf_counter()
+        rows = cv.ensure_list(value)
+        result = []
+        for index, row in enumerate(rows):
+            if (
+                isinstance(row, dict)
+                and required.issubset(row)
+                and all(
+                    key in types and _has_type(item, types[key])
+                    for key, item in row.items()
+                )
+            ):
+                fast = {key: factory() for key, factory in defaults.items()}
+                fast.update(row)
+                result.append(fast)
+                continue
+            try:
+                result.append(schema(row))
+            except vol.Invalid as err:
+                err.prepend([index])
+                raise
+        _record(_validation_profile, f"validate {name}", time.perf_counter() - started, len(rows))
+        return result
+
+    return validate
+
+
+def profiled(platform: str) -> Callable:
+    """Decorate async_setup_platform/async_setup_entry to record setup time."""
+
+    def decorator(func):
+        kind = "yaml" if func.__name__ == "async_setup_platform" else "entry"
+
+        @wraps(func)
+        async def wrapper(hass, config, async_add_entities, *args, **kwargs):
+            added = 0
+
+            def _counting_add(entities, *add_args, **add_kwargs):
+                nonlocal added
+                entities = list(entities)
+                added += len(entities)
+                return async_add_entities(entities, *add_args, **add_kwargs)
+
+            started = time.perf_counter()
+            try:
+                return await func(hass, config, _counting_add, *args, **kwargs)
+            finally:
+                _record(
+                    hass.data.setdefault(PROFILE_KEY, {}),
+                    f"{platform} {kind}",
+                    time.perf_counter() - started,
+                    added,
+                )
+
+        return wrapper
+
+    return decorator
+
+
+def get_profile(hass) -> Dict[str, Dict[str, float]]:
+    """Validation and setup timings collected since startup."""
+    return {**_validation_profile, **hass.data.get(PROFILE_KEY, {})}
+
+
+@callback
+def async_log_profile_when_started(hass) -> None:
+    @callback
+    def _log(_hass) -> None:
+        profile = get_profile(hass)
+        if not profile:
+            return
+        _LOGGER.info(
+            "DINPLUG startup: %s",
+            ", ".join(
+                f"{name} {entry['seconds'] * 1000:.1f} ms ({entry['items']:g} items)"
+                for name, entry in sorted(
+                    profile.items(), key=lambda item: -item[1]["seconds"]
+                )
+            ),
+        )
+
+    async_at_started(hass, _log)
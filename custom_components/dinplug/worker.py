@@ -0,0 +1,213 @@
+"""Optional worker thread that owns a controller socket.
+
+The thread runs its own event loop to connect, read, decode and parse.
+Reports are collapsed per key and compared with what was last delivered;
+the remaining diffs (plus every button gesture, and the keys of loads
+reported unchanged, so their report times stay current) reach the Home
+Assistant loop through one call_soon_threadsafe per batch.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .connection import KEEPALIVE_INTERVAL, READ_CHUNK, RECONNECT_DELAY
+from .protocol import (
+    ButtonEvent,
+    Event,
+    HvacFanEvent,
+    HvacModeEvent,
+    HvacTemperatureEvent,
+    LineDecoder,
+    LoadEvent,
+    ShadeEvent,
+    encode_text,
+    parse_line,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# How long reports are collected before one batch is handed over
+BATCH_INTERVAL = 0.05
+# Forget what was delivered once this many keys are remembered; costs only
+# one redundant delivery per key, which the connection's caches absorb
+DELIVERED_LIMIT = 8192
+STOP_TIMEOUT = 5
+
+
+def _event_key(event: Event) -> Optional[Tuple]:
+    """Key under which later reports replace earlier ones; None for gestures."""
+    if isinstance(event, (LoadEvent, ShadeEvent)):
+        return (type(event), event.device, event.channel)
+    if isinstance(event, HvacTemperatureEvent):
+        return (HvacTemperatureEvent, event.device, event.kind)
+    if isinstance(event, (HvacModeEvent, HvacFanEvent)):
+        return (type(event), event.device)
+    return None
+
+
+class ConnectionWorker:
+    """Socket, keepalive and parser for one M4Connection, on a private thread."""
+
+    def __init__(self, conn, main_loop: asyncio.AbstractEventLoop):
+        self._conn = conn
+        self._main_loop = main_loop
+        self._loop = asyncio.new_event_loop()
+        self._thread: Optional[threading.Thread] = None
+        self._task: Optional[asyncio.Task] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+        # Worker-thread state only
+        self._pending: Dict[Tuple, Event] = {}
+        self._gestures: List[ButtonEvent] = []
+        self._lines: List[str] = []
+        self._delivered: Dict[Tuple, Event] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def start(self) -> None:
+        self._task = self._loop.create_task(self._run())
+        self._thread = threading.Thread(
+            target=self._run_thread,
+            name=f"dinplug-{self._conn.host}:{self._conn.port}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Cancel the worker and wait for its thread; blocking, use an executor."""
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._task.cancel)
+        self._thread.join(STOP_TIMEOUT)
+        self._thread = None
+
+    def write(self, data: bytes) -> None:
+        """Queue bytes for the socket; safe to call from the Home Assistant loop."""
+        self._loop.call_soon_threadsafe(self._write_now, data)
+
+    # Worker thread ---------------------------------------------------------
+
+    def _run_thread(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    def _write_now(self, data: bytes) -> None:
+        if self._writer is not None:
+            self._writer.write(data)
+        else:
+            # The link dropped after the main loop handed this over; let the
+            # connection buffer it like any command sent while disconnected
+            self._notify_main(self._conn._requeue, data)
+
+    def _send(self, cmd: str) -> None:
+        _LOGGER.debug("TX: %s", cmd)
+        self._conn._record_trace("TX", cmd)
+        self._write_now(encode_text(cmd))
+
+    def _notify_main(self, callback, *args) -> None:
+        try:
+            self._main_loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # Home Assistant's loop is already closed during shutdown
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                _LOGGER.info(
+                    "Connecting to M4 DINPLUG at %s:%s (worker thread)",
+                    self._conn.host,
+                    self._conn.port,
+                )
+                reader, self._writer = await asyncio.open_connection(
+                    self._conn.host, self._conn.port
+                )
+                _LOGGER.info("M4 DINPLUG connected")
+                self._send("REFRESH")
+                self._notify_main(self._conn._worker_connected, True)
+
+                keepalive = self._loop.create_task(self._keepalive_loop())
+                decoder = LineDecoder()
+                try:
+                    while data := await reader.read(READ_CHUNK):
+                        for text in decoder.feed(data):
+                            self._receive(text)
+                        if self._flush_handle is None and (
+                            self._pending or self._gestures or self._lines
+                        ):
+                            self._flush_handle = self._loop.call_later(
+                                BATCH_INTERVAL, self._flush
+                            )
+                    raise ConnectionError("EOF from controller")
+                finally:
+                    keepalive.cancel()
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                _LOGGER.warning("M4 DINPLUG connection error: %s", err)
+                if self._writer is None:
+                    # The reconnect attempt itself failed
+                    self._notify_main(self._conn._link_failed)
+            finally:
+                self._flush()
+                if self._writer is not None:
+                    self._writer.close()
+                self._writer = None
+                self._notify_main(self._conn._worker_connected, False)
+
+            _LOGGER.info("Reconnecting to M4 DINPLUG in %s seconds", RECONNECT_DELAY)
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _keepalive_loop(self) -> None:
+        while True:
+            self._send("STA")
+            await asyncio.sleep(KEEPALIVE_INTERVAL)
+
+    def _receive(self, text: str) -> None:
+        _LOGGER.debug("RX: %s", text)
+        self._conn._record_trace("RX", text)
+        if self._conn.has_line_listeners:
+            self._lines.append(text)
+        event = parse_line(text)
+        if event is None:
+            return
+        key = _event_key(event)
+        if key is None:
+            self._gestures.append(event)
+        else:
+            self._pending[key] = event
+
+    def _flush(self) -> None:
+        """Hand every changed key and gesture to the main loop in one call."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        events: List[Event] = []
+        # Loads reported unchanged: only their report time is passed on
+        touched: List[Tuple[int, int]] = []
+        if len(self._delivered) > DELIVERED_LIMIT:
+            self._delivered.clear()
+        for key, event in self._pending.items():
+            # A load someone is querying must be delivered even if unchanged
+            if self._delivered.get(key) != event or (
+                isinstance(event, LoadEvent)
+                and self._conn.is_load_queried(event.device, event.channel)
+            ):
+                self._delivered[key] = event
+                events.append(event)
+            elif isinstance(event, LoadEvent):
+                touched.append((event.device, event.channel))
+        self._pending.clear()
+        events.extend(self._gestures)
+        lines = self._lines
+        self._gestures = []
+        self._lines = []
+        if events or lines or touched:
+            self._notify_main(self._conn._apply_batch, events, lines, touched)
@@ -0,0 +1,324 @@
+"""Command-line monitor and load tool for DINPLUG/M4 controllers.
+
+Uses the integration's sans-IO protocol module directly, so it runs without
+Home Assistant installed:
+
+    python dinplug-cli.py monitor 192.168.1.30
+    python dinplug-cli.py send 192.168.1.30 load 104 1 50 --fade 2
+    python dinplug-cli.py ping 192.168.1.30 104 1 -n 200
+    python dinplug-cli.py simulate --port 2323
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+DEFAULT_PORT = 23
+
+
+def _load_protocol():
+    """Import protocol.py by path; the package __init__ needs Home Assistant."""
+    path = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "custom_components",
+        "dinplug",
+        "protocol.py",
+    )
+    spec = importlib.util.spec_from_file_location("dinplug_protocol", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+protocol = _load_protocol()
+
+
+def _send(writer, command) -> None:
+    writer.write(protocol.encode(command))
+
+
+# ---------- monitor ----------
+
+
+async def monitor(args) -> int:
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    decoder = protocol.Protocol()
+    counts = Counter()
+    window_start = time.monotonic()
+    if args.refresh:
+        _send(writer, protocol.RawCommand("REFRESH"))
+
+    try:
+        while True:
+            try:
+                data = await asyncio.wait_for(reader.read(65536), args.stats_interval)
+            except asyncio.TimeoutError:
+                data = None
+            if data == b"":
+                print("connection closed by controller", file=sys.stderr)
+                return 1
+            for event in decoder.receive(data or b""):
+                counts[type(event).__name__] += 1
+                if not args.quiet:
+                    print(f"{time.strftime('%H:%M:%S')} {event}")
+
+            elapsed = time.monotonic() - window_start
+            if elapsed >= args.stats_interval:
+                rates = ", ".join(
+                    f"{name}={count / elapsed:.1f}/s" for name, count in sorted(counts.items())
+                )
+                print(f"-- rates over {elapsed:.1f}s: {rates or 'no events'}", file=sys.stderr)
+                counts.clear()
+                window_start = time.monotonic()
+    finally:
+        writer.close()
+
+
+# ---------- send ----------
+
+
+def _build_command(args):
+    if args.kind == "load":
+        return protocol.LoadCommand(args.device, args.channel, args.level, args.fade)
+    if args.kind == "shade":
+        if args.action == "set" and args.level is None:
+            raise ValueError("shade set requires a level")
+        return protocol.ShadeCommand(args.action.upper(), args.device, args.channel, args.level)
+    if args.action == "setpoint":
+        return protocol.HvacSetpointCommand(args.device, float(args.value))
+    if args.action == "mode":
+        return protocol.HvacModeCommand(args.device, args.value)
+    return protocol.HvacFanCommand(args.device, args.value)
+
+
+async def send(args) -> int:
+    command = _build_command(args)
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    try:
+        _send(writer, command)
+        await writer.drain()
+        print(f"sent: {protocol.command_text(command)}")
+        # Show whatever the controller echoes back for a moment
+        decoder = protocol.Protocol()
+        deadline = time.monotonic() + args.wait
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                data = await asyncio.wait_for(reader.read(65536), remaining)
+            except asyncio.TimeoutError:
+                break
+            if not data:
+                break
+            for event in decoder.receive(data):
+                print(event)
+    finally:
+        writer.close()
+    return 0
+
+
+# ---------- ping ----------
+
+
+async def ping(args) -> int:
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    decoder = protocol.Protocol()
+    pending = []
+    latencies = []
+    timeouts = 0
+
+    async def read_until(predicate, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            while pending:
+                event = pending.pop(0)
+                if predicate(event):
+                    return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                data = await asyncio.wait_for(reader.read(65536), remaining)
+            except asyncio.TimeoutError:
+                return False
+            if not data:
+                raise ConnectionError("connection closed by controller")
+            pending.extend(decoder.receive(data))
+
+    try:
+        for i in range(args.count):
+            level = args.levels[i % len(args.levels)]
+            expected = protocol.LoadEvent(args.device, args.channel, level)
+            pending.clear()
+            started = time.perf_counter()
+            _send(writer, protocol.LoadCommand(args.device, args.channel, level))
+            if await read_until(lambda event: event == expected, args.timeout):
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                timeouts += 1
+            if args.interval:
+                await asyncio.sleep(args.interval)
+    finally:
+        writer.close()
+
+    print(f"round trips: {len(latencies)} ok, {timeouts} timed out")
+    if len(latencies) >= 2:
+        q = statistics.quantiles(latencies, n=100, method="inclusive")
+        print(
+            f"latency ms: min={min(latencies):.1f} p50={q[49]:.1f} "
+            f"p95={q[94]:.1f} p99={q[98]:.1f} max={max(latencies):.1f}"
+        )
+    return 0 if latencies and not timeouts else 1
+
+
+# ---------- simulate ----------
+
+
+class FakeController:
+    """Minimal local stand-in that echoes commands as R: reports."""
+
+    def __init__(self, delay: float = 0.0):
+        self._delay = delay
+        self._loads = {}
+        self._shades = {}
+        self._writers = set()
+
+    async def handle(self, reader, writer) -> None:
+        self._writers.add(writer)
+        decoder = protocol.LineDecoder()
+        try:
+            while data := await reader.read(65536):
+                for text in decoder.feed(data):
+                    await self._command(text, writer)
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def broadcast(self, text: str) -> None:
+        """Send an unsolicited report line to every connected client."""
+        for writer in list(self._writers):
+            writer.write(protocol.encode_text(text))
+
+    def disconnect_all(self) -> None:
+        """Drop every client connection, as a controller reboot would."""
+        for writer in list(self._writers):
+            writer.close()
+        self._writers.clear()
+
+    async def _command(self, text: str, writer) -> None:
+        parts = text.split()
+        if not parts:
+            return
+        if self._delay:
+            await asyncio.sleep(self._delay)
+        if parts[0] == "REFRESH":
+            for (dev, ch), level in self._loads.items():
+                writer.write(protocol.encode_text(f"R:LOAD {dev} {ch} {level}"))
+            for (dev, ch), level in self._shades.items():
+                writer.write(protocol.encode_text(f"R:SHADE {dev} {ch} {level}"))
+        elif parts[0] == "LOAD" and len(parts) >= 4:
+            key = (int(parts[1]), int(parts[2]))
+            self._loads[key] = int(parts[3])
+            self.broadcast(f"R:LOAD {key[0]} {key[1]} {self._loads[key]}")
+        elif parts[0] == "SHADE" and len(parts) >= 4:
+            key = (int(parts[2]), int(parts[3]))
+            if parts[1] == "SET" and len(parts) >= 5:
+                self._shades[key] = int(parts[4])
+            elif parts[1] in ("UP", "DOWN"):
+                self._shades[key] = 100 if parts[1] == "UP" else 0
+            else:
+                return
+            self.broadcast(f"R:SHADE {key[0]} {key[1]} {self._shades[key]}")
+        elif parts[0] == "HVAC" and len(parts) >= 3:
+            if parts[1] == "SETPOINT" and len(parts) >= 4:
+                self.broadcast(f"R:HVAC SETPOINT {parts[2]} {parts[3]}")
+            else:
+                self.broadcast(f"R:HVAC {parts[1]} {parts[2]}")
+
+
+async def simulate(args) -> int:
+    controller = FakeController(args.delay)
+    server = await asyncio.start_server(controller.handle, args.bind, args.port)
+    print(f"fake controller listening on {args.bind}:{args.port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+    return 0
+
+
+# ---------- entry point ----------
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="dinplug-cli.py", description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    def with_host(p):
+        p.add_argument("host")
+        p.add_argument("--port", type=int, default=DEFAULT_PORT)
+        return p
+
+    p = with_host(sub.add_parser("monitor", help="tail decoded events and event rates"))
+    p.add_argument("--stats-interval", type=float, default=5.0)
+    p.add_argument("--refresh", action="store_true", help="send REFRESH on connect")
+    p.add_argument("-q", "--quiet", action="store_true", help="print rates only")
+    p.set_defaults(func=monitor)
+
+    p = with_host(sub.add_parser("send", help="send one LOAD/SHADE/HVAC command"))
+    p.add_argument("--wait", type=float, default=1.0, help="seconds to print replies")
+    kinds = p.add_subparsers(dest="kind", required=True)
+    k = kinds.add_parser("load")
+    k.add_argument("device", type=int)
+    k.add_argument("channel", type=int)
+    k.add_argument("level", type=int)
+    k.add_argument("--fade", type=int)
+    k = kinds.add_parser("shade")
+    k.add_argument("device", type=int)
+    k.add_argument("channel", type=int)
+    k.add_argument("action", choices=["up", "down", "stop", "set"])
+    k.add_argument("level", type=int, nargs="?")
+    k = kinds.add_parser("hvac")
+    k.add_argument("device", type=int)
+    k.add_argument("action", choices=["setpoint", "mode", "fan"])
+    k.add_argument("value")
+    p.set_defaults(func=send)
+
+    p = with_host(
+        sub.add_parser("ping", help="time LOAD command-to-R:LOAD echo round trips")
+    )
+    p.add_argument("device", type=int)
+    p.add_argument("channel", type=int)
+    p.add_argument("-n", "--count", type=int, default=50)
+    p.add_argument(
+        "--levels",
+        type=lambda v: [int(x) for x in v.split(",")],
+        default=[40, 60],
+        help="levels to alternate between (the load will move!)",
+    )
+    p.add_argument("--timeout", type=float, default=2.0)
+    p.add_argument("--interval", type=float, default=0.0)
+    p.set_defaults(func=ping)
+
+    p = sub.add_parser("simulate", help="run a local stand-in controller")
+    p.add_argument("--bind", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=2323)
+    p.add_argument("--delay", type=float, default=0.0, help="seconds per command")
+    p.set_defaults(func=simulate)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    try:
+        sys.exit(asyncio.run(args.func(args)))
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ValueError) as err:
+        sys.exit(f"error: {err}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Long-running soak test for the dinplug integration.
+
+Starts a local stand-in controller and a minimal Home Assistant instance
+with one dinplug controller (lights, covers, thermostats and buttons), then
+replays mixed traffic for the requested duration:
+
+* scene storms (every load reported at once),
+* keypad PRESS / repeated HOLD / RELEASE sequences,
+* thermostat temperature drift,
+* forced disconnects of every client.
+
+It records the latency from a line arriving at M4Connection to the matching
+entity state being written, and samples task count, listener count and RSS.
+A resource that keeps growing after warm-up is reported as a failing trend
+(exit code 1). Requires Home Assistant to be installed:
+
+    python dinplug-soak.py --hours 4 --csv soak.csv
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+HOST = "127.0.0.1"
+
+
+def _load_cli():
+    """Import dinplug-cli.py by path for its protocol and FakeController."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dinplug-cli.py")
+    spec = importlib.util.spec_from_file_location("dinplug_cli", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+cli = _load_cli()
+
+
+def rss_bytes() -> int:
+    """Current resident set size (falls back to peak RSS off Linux)."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def build_config(args) -> dict:
+    devices = range(100, 100 + args.devices)
+    return {
+        "homeassistant": {},
+        "dinplug": {
+            "controllers": [
+                {
+                    "host": HOST,
+                    "port": args.port,
+                    "lights": [
+                        {"name": f"Load {d} {c}", "device": d, "channel": c}
+                        for d in devices
+                        for c in range(1, 5)
+                    ],
+                    "covers": [
+                        {"name": f"Shade {d}", "device": d, "channel": 5}
+                        for d in devices
+                    ],
+                    "hvac": [{"name": f"HVAC {d}", "device": d} for d in devices],
+                    "buttons": [
+                        {"name": f"Key {d} {b}", "device": d, "button": b}
+                        for d in devices
+                        for b in range(1, 4)
+                    ],
+                }
+            ]
+        },
+    }
+
+
+async def start_hass(config_dir: str, config: dict):
+    from homeassistant import bootstrap, loader
+    from homeassistant.core import HomeAssistant
+
+    # Make the repository's custom component visible to this instance
+    os.symlink(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "custom_components"),
+        os.path.join(config_dir, "custom_components"),
+    )
+    hass = HomeAssistant(config_dir)
+    if hasattr(loader, "async_setup"):
+        loader.async_setup(hass)
+    await bootstrap.async_from_config_dict(config, hass)
+    # Fire EVENT_HOMEASSISTANT_STARTED so async_at_started work (discovery,
+    # proxy) runs as it would in production
+    await hass.async_start()
+    await hass.async_block_till_done()
+    return hass
+
+
+class LatencyProbe:
+    """Pair line arrival times with the state writes they cause."""
+
+    def __init__(self, hass, conn, port: int):
+        from homeassistant.const import EVENT_STATE_CHANGED
+        from homeassistant.helpers import entity_registry as er
+
+        self._hass = hass
+        self._pending = {}
+        self.samples = []
+        self._entity_keys = {}
+        prefix = f"{HOST}-{port}-"
+        for entry in er.async_get(hass).entities.values():
+            if entry.platform != "dinplug" or not entry.unique_id.startswith(prefix):
+                continue
+            parts = entry.unique_id[len(prefix):].split("-")
+            if len(parts) == 2:
+                self._entity_keys[entry.entity_id] = ("load", int(parts[0]), int(parts[1]))
+            elif parts[0] == "shade":
+                self._entity_keys[entry.entity_id] = ("shade", int(parts[1]), int(parts[2]))
+        self._entity_ids = {key: entity_id for entity_id, key in self._entity_keys.items()}
+        conn.register_line_listener(self._line)
+        hass.bus.async_listen(EVENT_STATE_CHANGED, self._state_changed)
+
+    def _line(self, text: str) -> None:
+        event = cli.protocol.parse_line(text)
+        if isinstance(event, cli.protocol.LoadEvent):
+            key = ("load", event.device, event.channel)
+        elif isinstance(event, cli.protocol.ShadeEvent):
+            key = ("shade", event.device, event.channel)
+        else:
+            return
+        if self._already_shown(key, event.level):
+            # No state write will follow; a stale stamp would be paired
+            # with some later, unrelated change
+            self._pending.pop(key, None)
+        else:
+            self._pending[key] = time.perf_counter()
+
+    def _already_shown(self, key, level: int) -> bool:
+        entity_id = self._entity_ids.get(key)
+        state = self._hass.states.get(entity_id) if entity_id else None
+        if state is None:
+            return False
+        if key[0] == "shade":
+            return state.attributes.get("current_position") == level
+        if level == 0:
+            return state.state == "off"
+        return state.state == "on" and state.attributes.get("brightness") == int(level * 255 / 100)
+
+    def _state_changed(self, event) -> None:
+        key = self._entity_keys.get(event.data.get("entity_id"))
+        if key is None:
+            return
+        new_state = event.data.get("new_state")
+        if new_state is None or new_state.state == "unavailable":
+            return
+        arrived = self._pending.pop(key, None)
+        if arrived is not None:
+            self.samples.append((time.perf_counter() - arrived) * 1000)
+
+    def drain(self):
+        samples, self.samples = self.samples, []
+        return samples
+
+
+def listener_count(hass, conn) -> int:
+    total = sum(hass.bus.async_listeners().values())
+    for index in (
+        conn._load_listeners,
+        conn._shade_listeners,
+        conn._button_listeners,
+        conn._thermostat_listeners,
+    ):
+        total += sum(len(listeners) for listeners in index.values())
+    total += len(conn._availability_listeners) + len(conn._line_listeners)
+    total += len(conn._discovery_listeners)
+    return total
+
+
+async def traffic(controller, args, stop: asyncio.Event) -> None:
+    devices = list(range(100, 100 + args.devices))
+    temps = {d: 22.0 for d in devices}
+    next_storm = next_disconnect = time.monotonic()
+    next_storm += args.storm_interval
+    next_disconnect += args.disconnect_interval
+    while not stop.is_set():
+        now = time.monotonic()
+        if now >= next_storm:
+            next_storm = now + args.storm_interval
+            for d in devices:
+                for c in range(1, 5):
+                    controller.broadcast(f"R:LOAD {d} {c} {random.randint(0, 100)}")
+                controller.broadcast(f"R:SHADE {d} 5 {random.randint(0, 100)}")
+        if now >= next_disconnect:
+            next_disconnect = now + args.disconnect_interval
+            controller.disconnect_all()
+
+        d = random.choice(devices)
+        b = random.randint(1, 3)
+        controller.broadcast(f"R:BTN PRESS {d} {b}")
+        for _ in range(random.randint(0, 10)):
+            await asyncio.sleep(0.1)
+            controller.broadcast(f"R:BTN HOLD {d} {b}")
+        controller.broadcast(f"R:BTN RELEASE {d} {b}")
+
+        for d in devices:
+            temps[d] = max(10.0, min(35.0, temps[d] + random.uniform(-0.2, 0.2)))
+            controller.broadcast(f"R:HVAC CURRENTTEMP {d} {temps[d]:.1f}")
+        await asyncio.sleep(1)
+
+
+def failing_trends(samples, tolerance) -> list:
+    """Compare the last third of the run with the first third after warm-up."""
+    if len(samples) < 6:
+        return []
+    third = len(samples) // 3
+    failures = []
+    for column, limit in (("tasks", tolerance["tasks"]), ("listeners", 0), ("rss", tolerance["rss"])):
+        early = statistics.mean(s[column] for s in samples[:third])
+        late = statistics.mean(s[column] for s in samples[-third:])
+        if late - early > limit:
+            failures.append(f"{column} grew from {early:.0f} to {late:.0f}")
+    return failures
+
+
+async def run(args) -> int:
+    controller = cli.FakeController()
+    server = await asyncio.start_server(controller.handle, HOST, args.port)
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await start_hass(config_dir, build_config(args))
+        conn = hass.data["dinplug"][(HOST, args.port)]
+        probe = LatencyProbe(hass, conn, args.port)
+
+        stop = asyncio.Event()
+        generator = asyncio.create_task(traffic(controller, args, stop))
+        started = time.monotonic()
+        deadline = started + args.hours * 3600
+        warmup = started + args.warmup
+        samples = []
+        csv_file = open(args.csv, "w", encoding="utf-8") if args.csv else None
+        if csv_file:
+            csv_file.write("elapsed_s,tasks,listeners,rss_mb,lat_p50_ms,lat_p99_ms\n")
+
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(args.sample_interval)
+                latencies = probe.drain()
+                sample = {
+                    "elapsed": time.monotonic() - started,
+                    "tasks": len(asyncio.all_tasks()),
+                    "listeners": listener_count(hass, conn),
+                    "rss": rss_bytes() / 1e6,
+                }
+                p50 = p99 = float("nan")
+                if len(latencies) >= 2:
+                    q = statistics.quantiles(latencies, n=100, method="inclusive")
+                    p50, p99 = q[49], q[98]
+                line = (
+                    f"{sample['elapsed']:.0f},{sample['tasks']},{sample['listeners']},"
+                    f"{sample['rss']:.1f},{p50:.2f},{p99:.2f}"
+                )
+                print(line)
+                if csv_file:
+                    csv_file.write(line + "\n")
+                    csv_file.flush()
+                if time.monotonic() >= warmup:
+                    samples.append(sample)
+        finally:
+            stop.set()
+            await generator
+            if csv_file:
+                csv_file.close()
+            await hass.async_stop()
+            server.close()
+
+    failures = failing_trends(samples, {"tasks": args.task_tolerance, "rss": args.rss_tolerance_mb})
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="dinplug-soak.py", description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=2324, help="stand-in controller port")
+    parser.add_argument("--devices", type=int, default=25, help="modules to simulate")
+    parser.add_argument("--storm-interval", type=float, default=30.0)
+    parser.add_argument("--disconnect-interval", type=float, default=300.0)
+    parser.add_argument("--sample-interval", type=float, default=60.0)
+    parser.add_argument("--warmup", type=float, default=600.0, help="seconds ignored by trends")
+    parser.add_argument("--task-tolerance", type=int, default=5)
+    parser.add_argument("--rss-tolerance-mb", type=float, default=20.0)
+    parser.add_argument("--csv", help="write samples to this CSV file")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()